@@ -0,0 +1,24 @@
+"""Version stamps for cached data.
+
+Cache keys embed the current version of what they were built from, bumping the
+version makes all of them unreachable at once. Versions are timestamps instead
+of counters, so a version evicted from the cache can never be reused for stale
+entries."""
+
+import time
+
+from django.core.cache import cache
+
+
+def get_version(key: str) -> int:
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        cache.set(key, version, timeout=None)
+    return version
+
+
+def bump_version(key: str) -> int:
+    version = time.time_ns()
+    cache.set(key, version, timeout=None)
+    return version
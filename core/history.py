@@ -0,0 +1,116 @@
+"""Batched writes of historical records.
+
+Every save of a model with history inserts its historical record right away.
+Within :func:`batched_history` the saves of all models using
+:class:`BatchedHistoricalRecords` are collected instead and their records are
+inserted with simple_history's bulk_history_create per model when the block
+ends, in the same transaction. Saves within a savepoint that is rolled back
+get no record, like without batching."""
+
+import copy
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+from django.db import connection, transaction
+from django.utils import timezone
+from simple_history.manager import HistoryManager
+from simple_history.models import HistoricalRecords
+from simple_history.signals import (
+    post_create_historical_record,
+    pre_create_historical_record,
+)
+
+
+@dataclass
+class HistoryBuffer:
+    # (history manager, history type, snapshot of the instance, savepoint)
+    saves: list[tuple] = field(default_factory=list)
+    # One on_commit marker per stack of savepoints, Django discards the
+    # markers of a savepoint when it is rolled back
+    markers: dict[tuple[str, ...], object] = field(default_factory=dict)
+
+    def savepoint(self) -> object:
+        key = tuple(connection.savepoint_ids)
+        if key not in self.markers:
+
+            def marker():
+                pass
+
+            transaction.on_commit(marker)
+            self.markers[key] = marker
+        return self.markers[key]
+
+    def committed_saves(self) -> list[tuple]:
+        alive = {id(callback) for _, callback, *_ in connection.run_on_commit}
+        return [save for save in self.saves if id(save[3]) in alive]
+
+
+_buffer: ContextVar[HistoryBuffer | None] = ContextVar("history_buffer", default=None)
+
+
+class BatchedHistoricalRecords(HistoricalRecords):
+    if TYPE_CHECKING:
+        # Replaced by a HistoryDescriptor when the model class is created
+        def __get__(self, instance: Any, owner: Any) -> HistoryManager: ...
+
+    def batchable(self, instance, history_type) -> bool:
+        # Deletions are rare and the instance is gone afterwards. The bulk
+        # insert sends no signals and skips m2m fields, those records are
+        # written right away.
+        history_model = getattr(instance, self.manager_name).model
+        return not (
+            history_type == "-"
+            or self.m2m_fields
+            or self.use_base_model_db
+            or pre_create_historical_record.has_listeners(history_model)
+            or post_create_historical_record.has_listeners(history_model)
+        )
+
+    def create_historical_record(self, instance, history_type, using=None):
+        buffer = _buffer.get()
+        if buffer is None or not self.batchable(instance, history_type):
+            return super().create_historical_record(instance, history_type, using)
+
+        # The instance may change again within the block, the record keeps
+        # its state, date and user of this save.
+        snapshot = copy.copy(instance)
+        snapshot._history_date = getattr(instance, "_history_date", timezone.now())
+        snapshot._history_user = self.get_history_user(instance)
+
+        manager = getattr(type(instance), self.manager_name)
+        buffer.saves.append((manager, history_type, snapshot, buffer.savepoint()))
+        return None
+
+
+def flush_history(buffer: HistoryBuffer) -> None:
+    managers = {}
+    by_model: dict[tuple[type, str], list] = {}
+    for manager, history_type, snapshot, _ in buffer.committed_saves():
+        managers[manager.model] = manager
+        by_model.setdefault((manager.model, history_type), []).append(snapshot)
+
+    for (model, history_type), snapshots in by_model.items():
+        managers[model].bulk_history_create(
+            snapshots, batch_size=1000, update=history_type == "~"
+        )
+    buffer.saves.clear()
+
+
+@contextmanager
+def batched_history():
+    """Collect the historical records written in the block and insert them in
+    bulk at its end. Nested blocks join the outermost one."""
+    if _buffer.get() is not None:
+        yield
+        return
+
+    buffer = HistoryBuffer()
+    token = _buffer.set(buffer)
+    try:
+        with transaction.atomic():
+            yield
+            flush_history(buffer)
+    finally:
+        _buffer.reset(token)
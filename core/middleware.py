@@ -0,0 +1,42 @@
+import logging
+from collections.abc import Callable
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from core.query_budget import QueryBudgetExceeded, QueryRecorder
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetMiddleware:
+    """Record the SQL queries of each request and compare them to the budget
+    of the API operation, if it declared one.
+
+    Only active if QUERY_BUDGET_ENABLED is set (debug and staging), with
+    QUERY_BUDGET_STRICT an exceeded budget fails the request."""
+
+    def __init__(self, get_response: Callable):
+        if not settings.QUERY_BUDGET_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryRecorder().record() as recorder:
+            response = self.get_response(request)
+
+        response["X-Query-Count"] = str(recorder.queries)
+        response["X-Query-Rows"] = str(recorder.rows)
+
+        budget = getattr(request, "query_budget", None)
+        if budget is None:
+            return response
+
+        try:
+            budget.check(recorder)
+        except QueryBudgetExceeded as e:
+            if settings.QUERY_BUDGET_STRICT:
+                raise
+            logger.warning("%s %s: %s", request.method, request.path, e)
+
+        return response
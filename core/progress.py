@@ -0,0 +1,62 @@
+"""Throttled progress reporting for long running tasks.
+
+Tasks advance a :class:`ProgressReporter` for every processed item, the
+reporter only calls its callback when the percentage or the time bucket
+changes, so the number of writes is bounded independent of the item count."""
+
+import time
+from collections.abc import Callable
+from datetime import timedelta
+
+
+class ProgressReporter:
+    def __init__(
+        self,
+        total: int,
+        report: Callable[["ProgressReporter"], None],
+        interval: float = 5.0,
+    ):
+        self.total = total
+        self.report = report
+        self.interval = interval
+        self.processed = 0
+        self.started = time.monotonic()
+        self._reported: tuple[int, int] | None = None
+
+    @property
+    def percent(self) -> int:
+        if not self.total:
+            return 100
+        return min(100, self.processed * 100 // self.total)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def rows_per_second(self) -> float:
+        elapsed = self.elapsed
+        if elapsed <= 0:
+            return 0.0
+        return self.processed / elapsed
+
+    @property
+    def eta(self) -> timedelta | None:
+        """Estimated remaining time, None as long as nothing was processed."""
+        rate = self.rows_per_second
+        if not rate:
+            return None
+        return timedelta(seconds=max(0, self.total - self.processed) / rate)
+
+    def advance(self, count: int = 1) -> None:
+        self.processed += count
+        state = (self.percent, int(self.elapsed // self.interval))
+        if state != self._reported:
+            self._reported = state
+            self.report(self)
+
+    def finish(self) -> None:
+        """Report the final state, even if it was already reported."""
+        self.processed = max(self.processed, self.total)
+        self._reported = (self.percent, int(self.elapsed // self.interval))
+        self.report(self)
@@ -0,0 +1,96 @@
+"""SQL query budgets for API operations.
+
+Operations declare how many queries and fetched rows a single request may
+need with :func:`query_budget`. :class:`core.middleware.QueryBudgetMiddleware`
+records the actual numbers of every request (enabled by the
+QUERY_BUDGET_ENABLED setting), and tests use :func:`assert_query_budget` to
+fail as soon as an operation exceeds its budget."""
+
+import functools
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from django.db import connection
+
+QUERY_BUDGETS: dict[str, "QueryBudget"] = {}
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@dataclass(frozen=True)
+class QueryBudget:
+    name: str
+    queries: int
+    rows: int | None = None
+
+    def check(self, recorder: "QueryRecorder") -> None:
+        if recorder.queries > self.queries:
+            raise QueryBudgetExceeded(
+                f"{self.name} ran {recorder.queries} queries, budget is {self.queries}:\n"
+                + "\n".join(recorder.statements)
+            )
+        if self.rows is not None and recorder.rows > self.rows:
+            raise QueryBudgetExceeded(
+                f"{self.name} fetched {recorder.rows} rows, budget is {self.rows}"
+            )
+
+
+@dataclass
+class QueryRecorder:
+    """Counts the queries and the rows they returned or changed."""
+
+    queries: int = 0
+    rows: int = 0
+    statements: list[str] = field(default_factory=list)
+
+    def __call__(self, execute, sql, params, many, context):
+        result = execute(sql, params, many, context)
+        self.queries += 1
+        self.rows += max(0, context["cursor"].rowcount)
+        self.statements.append(sql)
+        return result
+
+    @contextmanager
+    def record(self):
+        with connection.execute_wrapper(self):
+            yield self
+
+
+def query_budget(queries: int, rows: int | None = None):
+    """Declare the query budget of an API operation.
+
+    Has to be the innermost decorator, so the first argument is the request.
+    The budget covers the whole request, including the queries run by
+    pagination and response serialization after the operation returned."""
+
+    def decorator(func):
+        budget = QueryBudget(f"{func.__module__}.{func.__qualname__}", queries, rows)
+        QUERY_BUDGETS[budget.name] = budget
+
+        @functools.wraps(func)
+        def wrapper(request, *args, **kwargs):
+            request.query_budget = budget
+            return func(request, *args, **kwargs)
+
+        wrapper.query_budget = budget  # type: ignore[attr-defined]
+        return wrapper
+
+    return decorator
+
+
+@contextmanager
+def assert_query_budget(operation):
+    """Fail if the block exceeds the budget of the operation.
+
+    The operation is either the decorated function or its budget name."""
+    if isinstance(operation, str):
+        budget = QUERY_BUDGETS[operation]
+    else:
+        budget = operation.query_budget
+
+    with QueryRecorder().record() as recorder:
+        yield recorder
+
+    budget.check(recorder)
@@ -107,6 +107,7 @@ MIDDLEWARE = [
     "simple_history.middleware.HistoryRequestMiddleware",
     "guard.middleware.NotFoundRateLimitMiddleware",
     "axes.middleware.AxesMiddleware",
+    "core.middleware.QueryBudgetMiddleware",
 ]
 
 ROOT_URLCONF = "core.urls"
@@ -275,7 +276,11 @@ CELERY_RESULT_EXTENDED = True
 CELERY_TASK_RESULT_EXPIRES = 60 * 60 * 24 * 30
 
 
-CELERY_TASK_QUEUES = [kombu.Queue("celery")]
+CELERY_TASK_QUEUES = [kombu.Queue("celery"), kombu.Queue("sms")]
+
+# SMS are sent by workers of their own queue, so slow responses of the SMS
+# provider do not hold up other tasks
+CELERY_TASK_ROUTES = {"sms.tasks.send_sms_task": {"queue": "sms"}}
 
 
 HEALTH_CHECK = {
@@ -616,6 +621,12 @@ SMSUP_API_TOKEN = env.str("SMSUP_API_TOKEN", default="")
 
 SIMULATE_SMS = env.bool("SIMULATE_SMS", default=False)
 
+SMS_POOL_SIZE = env.int("SMS_POOL_SIZE", default=10)
+SMS_MAX_RETRIES = env.int("SMS_MAX_RETRIES", default=5)
+# Bulk sending (reminders): parallel requests and messages per second
+SMS_BULK_CONCURRENCY = env.int("SMS_BULK_CONCURRENCY", default=4)
+SMS_RATE_LIMIT = env.float("SMS_RATE_LIMIT", default=10)
+
 SUPPORTED_SMS_CODES = env.list(
     "SMS_AVAILABLE_CODES", default=["41", "43", "32", "33", "39", "34", "351"]
 )
@@ -633,6 +644,25 @@ CSRF_COOKIE_SAMESITE = "Lax"
 MAX_KEY_LENGTH = env.int("MAX_KEY_LENGTH", default=512)
 
 DEEPL_API_KEY = env.str("DEEPL_API_KEY", default="")
+TEXTS_TRANSLATOR_BACKEND = env.str(
+    "TEXTS_TRANSLATOR_BACKEND", default="texts.translators.DeepLTranslator"
+)
+# Concurrent requests of a batch translation
+TEXTS_TRANSLATION_CONCURRENCY = env.int("TEXTS_TRANSLATION_CONCURRENCY", default=4)
+
+# Rate limiter of the guard middleware, guard.backends.RedisLimiter keeps the
+# hits in Redis instead of the database
+GUARD_LIMITER_BACKEND = env.str(
+    "GUARD_LIMITER_BACKEND", default="guard.backends.DatabaseLimiter"
+)
+GUARD_REDIS_URL = env.str("GUARD_REDIS_URL", default=REDIS_URL + "/3")
+
+VISIT_EXPORT_SHARD_SIZE = env.int("VISIT_EXPORT_SHARD_SIZE", default=20000)
+
+# Record SQL queries per request and compare them to the declared budgets of
+# the API operations (see core.query_budget), strict mode fails the request.
+QUERY_BUDGET_ENABLED = env.bool("QUERY_BUDGET_ENABLED", default=DEBUG)
+QUERY_BUDGET_STRICT = env.bool("QUERY_BUDGET_STRICT", default=False)
 
 SECURE_HSTS_SECONDS = env.int("SECURE_HSTS_SECONDS", default=0 if DEBUG else 3600)
 SECURE_SSL_REDIRECT = env.bool("SECURE_SSL_REDIRECT", default=not DEBUG)
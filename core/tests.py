@@ -0,0 +1,55 @@
+import time
+from datetime import timedelta
+
+from django.test import SimpleTestCase
+
+from core.progress import ProgressReporter
+
+
+class ProgressReporterTest(SimpleTestCase):
+    def setUp(self):
+        self.reports = []
+
+    def report(self, reporter: ProgressReporter):
+        self.reports.append(reporter.percent)
+
+    def test_reports_percent_changes(self):
+        reporter = ProgressReporter(1000, self.report, interval=3600)
+        for _ in range(1000):
+            reporter.advance()
+
+        self.assertEqual(self.reports, list(range(101)))
+
+    def test_reports_time_buckets(self):
+        reporter = ProgressReporter(1_000_000, self.report, interval=5)
+        reporter.advance()
+        reporter.advance()
+        self.assertEqual(len(self.reports), 1)
+
+        # Move the start back into the previous time bucket
+        reporter.started -= 5
+        reporter.advance()
+        reporter.advance()
+        self.assertEqual(len(self.reports), 2)
+
+    def test_finish(self):
+        reporter = ProgressReporter(10, self.report)
+        reporter.advance(3)
+        reporter.finish()
+
+        self.assertEqual(self.reports, [30, 100])
+        self.assertEqual(reporter.processed, 10)
+
+    def test_rows_per_second_and_eta(self):
+        reporter = ProgressReporter(100, self.report)
+        self.assertEqual(reporter.rows_per_second, 0)
+        self.assertIsNone(reporter.eta)
+
+        reporter.started = time.monotonic() - 10
+        reporter.advance(50)
+
+        eta = reporter.eta
+        self.assertAlmostEqual(reporter.rows_per_second, 5, delta=0.1)
+        self.assertIsInstance(eta, timedelta)
+        assert eta is not None
+        self.assertAlmostEqual(eta.total_seconds(), 10, delta=0.5)
@@ -7,7 +7,8 @@ from unfold.admin import ModelAdmin
 
 from core.admin import admin_site
 
-from .models import BlockedIdentifier, ProtectedEndpoint
+from .guard import invalidate_blocklist
+from .models import BlockedIdentifier, EndpointHitRollup, ProtectedEndpoint
 
 
 @admin.register(ProtectedEndpoint, site=admin_site)
@@ -58,4 +59,21 @@ class BlockedIdentifierAdmin(ModelAdmin):
 
     @admin.action(description="Clear selected blocks")
     def clear_blocks(self, request, queryset):
+        identifiers = set(queryset.values_list("identifier", flat=True))
         queryset.update(disabled_at=timezone.now(), disabled_by=request.user)
+        invalidate_blocklist(identifiers)
+
+
+@admin.register(EndpointHitRollup, site=admin_site)
+class EndpointHitRollupAdmin(ModelAdmin):
+    list_display = ("identifier", "endpoint", "hour", "hits")
+    list_filter = ("endpoint",)
+    search_fields = ("identifier",)
+    date_hierarchy = "hour"
+    ordering = ("-hour", "-hits")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class GuardConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "guard"
+
+    def ready(self):
+        # pylint: disable-next=import-outside-toplevel,unused-import
+        from guard import signals  # noqa: F401
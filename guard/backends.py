@@ -0,0 +1,62 @@
+"""Rate limiter backends of the guard middleware.
+
+A limiter records a tracked hit of an identifier on a protected endpoint and
+tells whether the identifier exceeded the endpoint's limit. The backend is
+configured with the GUARD_LIMITER_BACKEND setting."""
+
+import time
+from abc import ABC, abstractmethod
+from functools import lru_cache
+
+import redis
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .guard import check_block, track_hit
+from .models import ProtectedEndpoint
+
+
+class BaseLimiter(ABC):
+    @abstractmethod
+    def hit(self, identifier: str, endpoint: ProtectedEndpoint) -> bool:
+        """Record a hit, return whether the identifier has to be blocked."""
+
+
+class DatabaseLimiter(BaseLimiter):
+    """Stores every hit as BlockedEndpointHit and counts the window."""
+
+    def hit(self, identifier, endpoint):
+        track_hit(identifier, endpoint)
+        return check_block(identifier, endpoint)
+
+
+class RedisLimiter(BaseLimiter):
+    """Sliding window in a Redis sorted set per endpoint and identifier.
+
+    A hit costs one round trip and no database query, the sets expire with
+    the window."""
+
+    def __init__(self, url: str | None = None):
+        self.client = redis.Redis.from_url(url or settings.GUARD_REDIS_URL)
+
+    def hit(self, identifier, endpoint):
+        key = f"guard:hits:{endpoint.pk}:{identifier}"
+        now = time.time()
+
+        pipeline = self.client.pipeline()
+        pipeline.zadd(key, {str(time.time_ns()): now})
+        pipeline.zremrangebyscore(key, "-inf", now - endpoint.window)
+        pipeline.zcard(key)
+        pipeline.expire(key, endpoint.window)
+        _, _, count, _ = pipeline.execute()
+
+        if count >= endpoint.max_errors:
+            # Start over once the block ends
+            self.client.delete(key)
+            return True
+        return False
+
+
+@lru_cache(maxsize=1)
+def get_limiter() -> BaseLimiter:
+    return import_string(settings.GUARD_LIMITER_BACKEND)()
@@ -1,46 +1,62 @@
 import datetime
 import logging
-import re
+import math
+import time
 
+from django.core.cache import cache
 from django.db.models import Q
 from django.utils import timezone
 
+from .matcher import match_endpoint
 from .models import BlockedEndpointHit, BlockedIdentifier, ProtectedEndpoint
 from .tasks import send_block_notification_email
 
 logger = logging.getLogger(__name__)
 
+BLOCKLIST_TIMEOUT = 60 * 5
 
-def check_blocked(identifier: str) -> bool:
-    """Check if the identifier is currently blocked"""
-    return (
-        BlockedIdentifier.objects.filter(
-            identifier=identifier,
-        )
+
+def blocklist_key(identifier: str) -> str:
+    return f"guard:blocked:{identifier}"
+
+
+def blocked_until(identifier: str) -> float:
+    """End of the active blocks of the identifier as timestamp, infinite if
+    blocked permanently and 0 if not blocked"""
+    ends = list(
+        BlockedIdentifier.objects.filter(identifier=identifier)
         .filter(Q(disabled_at__isnull=True) | Q(disabled_at__gt=timezone.now()))
-        .exists()
+        .values_list("disabled_at", flat=True)
     )
+    if not ends:
+        return 0
+    if None in ends:
+        return math.inf
+    return max(ends).timestamp()
 
 
-def check_hit(request, response):
-    """Check's if the request should be tracked for rate limiting.
+def check_blocked(identifier: str) -> bool:
+    """Check if the identifier is currently blocked
+
+    The end of the block is cached, changed blocks invalidate the cache (see
+    :mod:`guard.signals`)."""
+    key = blocklist_key(identifier)
+    until = cache.get(key)
+    if until is None:
+        until = blocked_until(identifier)
+        cache.set(key, until, timeout=BLOCKLIST_TIMEOUT)
+    return time.time() < until
 
-    Returns the endpoint if it should be tracked, None otherwise"""
-    endpoints = ProtectedEndpoint.objects.filter(status_code=response.status_code)
 
-    if not endpoints.exists():
-        return None
+def invalidate_blocklist(identifiers) -> None:
+    cache.delete_many([blocklist_key(identifier) for identifier in identifiers])
 
-    for endpoint in endpoints:
-        logger.info(
-            "Checking endpoint %s against request path %s", endpoint, request.path
-        )
 
-        if endpoint.path_matcher and re.match(endpoint.path_matcher, request.path):
-            logger.info("Matched path matcher for endpoint %s", endpoint)
-            return endpoint
+def check_hit(request, response):
+    """Check's if the request should be tracked for rate limiting.
 
-    return None
+    Returns the endpoint if it should be tracked, None otherwise"""
+    return match_endpoint(response.status_code, request.path)
 
 
 def track_hit(identifier: str, endpoint: ProtectedEndpoint):
@@ -76,14 +92,14 @@ def block_identifier(identifier: str, endpoint: ProtectedEndpoint):
         else None
     )
 
-    BlockedIdentifier.objects.create(
+    block = BlockedIdentifier.objects.create(
         identifier=identifier,
         reason=endpoint,
         disabled_at=block_until,
     )
 
     if endpoint.notification_email:
-        send_block_notification_email.delay(endpoint.pk)
+        send_block_notification_email.delay(block.pk)
 
 
 def get_identifier(request) -> str:
@@ -0,0 +1,115 @@
+"""Compiled matcher of the protected endpoints.
+
+The path matchers of all endpoints with the same status code are combined
+into one alternation, which tries them in order of their primary key like
+checking them one by one did. The matchers are built once per process and
+rebuilt when the endpoints changed, which every process notices within
+VERSION_CHECK_INTERVAL seconds (see :mod:`guard.signals`)."""
+
+import logging
+import re
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+
+from core.cache_version import bump_version, get_version
+
+from .models import ProtectedEndpoint
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "guard:endpoints:version"
+VERSION_CHECK_INTERVAL = 5
+
+_version: int | None = None
+_version_checked_at = 0.0
+
+
+@dataclass
+class EndpointMatcher:
+    endpoints: list[ProtectedEndpoint]
+    # Named group e<index> per endpoint, None if the path matchers cannot be
+    # combined (e.g. they define the same group names)
+    pattern: re.Pattern | None
+    patterns: list[re.Pattern]
+
+    @classmethod
+    def compile(cls, endpoints: list[ProtectedEndpoint]) -> "EndpointMatcher":
+        valid, patterns = [], []
+        for endpoint in endpoints:
+            try:
+                patterns.append(re.compile(endpoint.path_matcher))
+            except re.error as e:
+                # One broken endpoint must not break the checks of the others
+                logger.error(
+                    "Invalid path matcher of protected endpoint %s: %s",
+                    endpoint.pk,
+                    e,
+                )
+                continue
+            valid.append(endpoint)
+
+        pattern = None
+        if valid:
+            try:
+                pattern = re.compile(
+                    "|".join(
+                        f"(?P<e{index}>{endpoint.path_matcher})"
+                        for index, endpoint in enumerate(valid)
+                    )
+                )
+            except re.error:
+                pass
+        return cls(valid, pattern, patterns)
+
+    def match(self, path: str) -> ProtectedEndpoint | None:
+        if self.pattern is not None:
+            match = self.pattern.match(path)
+            if match is None:
+                return None
+            # The outermost group that matched is the endpoint's
+            return self.endpoints[int(match.lastgroup[1:])]
+
+        for endpoint, pattern in zip(self.endpoints, self.patterns):
+            if pattern.match(path):
+                return endpoint
+        return None
+
+
+def endpoints_version() -> int:
+    global _version, _version_checked_at  # pylint: disable=global-statement
+
+    now = time.monotonic()
+    if _version is None or now - _version_checked_at >= VERSION_CHECK_INTERVAL:
+        _version = get_version(VERSION_KEY)
+        _version_checked_at = now
+    return _version
+
+
+def invalidate_endpoints() -> None:
+    global _version  # pylint: disable=global-statement
+
+    _version = bump_version(VERSION_KEY)
+
+
+@lru_cache(maxsize=1)
+def _load_matchers(version: int) -> dict[int, EndpointMatcher]:
+    endpoints: dict[int, list[ProtectedEndpoint]] = {}
+    for endpoint in (
+        ProtectedEndpoint.objects.exclude(path_matcher__isnull=True)
+        .exclude(path_matcher="")
+        .order_by("pk")
+    ):
+        endpoints.setdefault(endpoint.status_code, []).append(endpoint)
+
+    return {
+        status_code: EndpointMatcher.compile(group)
+        for status_code, group in endpoints.items()
+    }
+
+
+def match_endpoint(status_code: int, path: str) -> ProtectedEndpoint | None:
+    matcher = _load_matchers(endpoints_version()).get(status_code)
+    if matcher is None:
+        return None
+    return matcher.match(path)
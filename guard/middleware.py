@@ -3,14 +3,8 @@ from collections.abc import Callable
 
 from django.http import JsonResponse
 
-from .guard import (
-    block_identifier,
-    check_block,
-    check_blocked,
-    check_hit,
-    get_identifier,
-    track_hit,
-)
+from .backends import get_limiter
+from .guard import block_identifier, check_blocked, check_hit, get_identifier
 
 logger = logging.getLogger(__name__)
 
@@ -31,10 +25,8 @@ class NotFoundRateLimitMiddleware:
 
         response = self.get_response(request)
 
-        if endpoint := check_hit(request, response):
-            track_hit(identifier, endpoint)
-
-            if check_block(identifier, endpoint):
-                block_identifier(identifier, endpoint)
+        endpoint = check_hit(request, response)
+        if endpoint and get_limiter().hit(identifier, endpoint):
+            block_identifier(identifier, endpoint)
 
         return response
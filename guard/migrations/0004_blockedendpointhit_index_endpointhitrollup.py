@@ -0,0 +1,51 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("guard", "0003_protectedendpoint_notification_email"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="blockedendpointhit",
+            index=models.Index(
+                fields=["endpoint", "identifier", "hit_at"],
+                name="guard_hit_endpoint_ident_at",
+            ),
+        ),
+        migrations.CreateModel(
+            name="EndpointHitRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("identifier", models.CharField(max_length=255)),
+                ("hour", models.DateTimeField()),
+                ("hits", models.IntegerField()),
+                (
+                    "endpoint",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="hit_rollups",
+                        to="guard.protectedendpoint",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("endpoint", "identifier", "hour"),
+                        name="guard_rollup_endpoint_ident_hour",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -26,6 +26,37 @@ class BlockedEndpointHit(models.Model):
     identifier = models.CharField(max_length=255)
     hit_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["endpoint", "identifier", "hit_at"],
+                name="guard_hit_endpoint_ident_at",
+            )
+        ]
+
+
+class EndpointHitRollup(models.Model):
+    """Number of hits per endpoint, identifier and hour, kept after the hits
+    themselves are purged."""
+
+    endpoint = models.ForeignKey(
+        ProtectedEndpoint,
+        on_delete=models.CASCADE,
+        related_name="hit_rollups",
+    )
+
+    identifier = models.CharField(max_length=255)
+    hour = models.DateTimeField()
+    hits = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["endpoint", "identifier", "hour"],
+                name="guard_rollup_endpoint_ident_hour",
+            )
+        ]
+
 
 class BlockedIdentifier(models.Model):
     identifier = models.CharField(max_length=255)
@@ -0,0 +1,18 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from guard.guard import invalidate_blocklist
+from guard.matcher import invalidate_endpoints
+from guard.models import BlockedIdentifier, ProtectedEndpoint
+
+
+@receiver(post_save, sender=BlockedIdentifier)
+@receiver(post_delete, sender=BlockedIdentifier)
+def invalidate_blocked_identifier(sender, instance, **kwargs):
+    invalidate_blocklist([instance.identifier])
+
+
+@receiver(post_save, sender=ProtectedEndpoint)
+@receiver(post_delete, sender=ProtectedEndpoint)
+def invalidate_protected_endpoint(sender, **kwargs):
+    invalidate_endpoints()
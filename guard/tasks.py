@@ -1,10 +1,20 @@
+import datetime
 import logging
 
 from celery import shared_task
 from django.conf import settings
 from django.core.mail import send_mail
+from django.db import transaction
+from django.db.models import Count, Max
+from django.db.models.functions import TruncHour
+from django.utils import timezone
 
-from guard.models import BlockedIdentifier, ProtectedEndpoint
+from guard.models import (
+    BlockedEndpointHit,
+    BlockedIdentifier,
+    EndpointHitRollup,
+    ProtectedEndpoint,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -38,3 +48,40 @@ To configure or disable notifications for this endpoint, edit the Protected Endp
         from_email=settings.DEFAULT_FROM_EMAIL,
         recipient_list=[email],
     )
+
+
+def retention_cutoff() -> datetime.datetime:
+    """Start of the hour before which no hit counts for any endpoint's window."""
+    window = ProtectedEndpoint.objects.aggregate(window=Max("window"))["window"] or 0
+    cutoff = timezone.now() - datetime.timedelta(seconds=window)
+    return cutoff.replace(minute=0, second=0, microsecond=0)
+
+
+@shared_task
+def purge_endpoint_hits() -> int:
+    """Roll the hits outside of all windows up into hourly counts and delete
+    them, returns the number of deleted hits.
+
+    Only whole hours are purged, so each rollup is written once; running the
+    task again after a failure recounts the same hits."""
+    cutoff = retention_cutoff()
+    hits = BlockedEndpointHit.objects.filter(hit_at__lt=cutoff)
+
+    with transaction.atomic():
+        EndpointHitRollup.objects.bulk_create(
+            [
+                EndpointHitRollup(**row)
+                for row in hits.annotate(hour=TruncHour("hit_at"))
+                .values("endpoint_id", "identifier", "hour")
+                .annotate(hits=Count("id"))
+                .order_by()
+            ],
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=["endpoint", "identifier", "hour"],
+            update_fields=["hits"],
+        )
+        deleted, _ = hits.delete()
+
+    logger.info("Purged %d endpoint hits before %s", deleted, cutoff)
+    return deleted
@@ -1 +1,112 @@
-# Create your tests here.
+import datetime
+import time
+
+from django.test import TestCase
+from django.utils import timezone
+
+from guard.backends import DatabaseLimiter, RedisLimiter
+from guard.guard import check_blocked
+from guard.matcher import match_endpoint
+from guard.models import (
+    BlockedEndpointHit,
+    BlockedIdentifier,
+    EndpointHitRollup,
+    ProtectedEndpoint,
+)
+from guard.tasks import purge_endpoint_hits
+
+
+class GuardTest(TestCase):
+    def setUp(self):
+        self.endpoint = ProtectedEndpoint.objects.create(
+            path_matcher=r"^/api/", description="API", max_errors=3
+        )
+
+    def test_database_limiter(self):
+        limiter = DatabaseLimiter()
+        self.assertFalse(limiter.hit("ip:1.2.3.4", self.endpoint))
+        self.assertFalse(limiter.hit("ip:1.2.3.4", self.endpoint))
+        self.assertFalse(limiter.hit("ip:5.6.7.8", self.endpoint))
+        self.assertTrue(limiter.hit("ip:1.2.3.4", self.endpoint))
+
+    def test_redis_limiter(self):
+        limiter = RedisLimiter()
+        self.endpoint.window = 1
+        key = f"guard:hits:{self.endpoint.pk}:ip:1.2.3.4"
+        limiter.client.delete(key)
+        self.addCleanup(limiter.client.delete, key)
+
+        self.assertFalse(limiter.hit("ip:1.2.3.4", self.endpoint))
+        self.assertFalse(limiter.hit("ip:1.2.3.4", self.endpoint))
+        time.sleep(1.1)
+        # The first hits left the window
+        self.assertFalse(limiter.hit("ip:1.2.3.4", self.endpoint))
+        self.assertFalse(limiter.hit("ip:1.2.3.4", self.endpoint))
+        self.assertTrue(limiter.hit("ip:1.2.3.4", self.endpoint))
+        self.assertFalse(limiter.client.exists(key))
+
+    def test_blocklist_cached(self):
+        self.assertFalse(check_blocked("ip:1.2.3.4"))
+        with self.assertNumQueries(0):
+            self.assertFalse(check_blocked("ip:1.2.3.4"))
+
+        block = BlockedIdentifier.objects.create(
+            identifier="ip:1.2.3.4",
+            reason=self.endpoint,
+            disabled_at=timezone.now() + datetime.timedelta(hours=1),
+        )
+        self.assertTrue(check_blocked("ip:1.2.3.4"))
+        with self.assertNumQueries(0):
+            self.assertTrue(check_blocked("ip:1.2.3.4"))
+
+        block.disabled_at = timezone.now()
+        block.save()
+        self.assertFalse(check_blocked("ip:1.2.3.4"))
+
+    def test_match_endpoint(self):
+        other = ProtectedEndpoint.objects.create(
+            path_matcher=r"^/api/case/", description="Cases", max_errors=3
+        )
+        ProtectedEndpoint.objects.create(
+            path_matcher=r"^/api/", description="Forbidden", status_code=403
+        )
+
+        self.assertEqual(match_endpoint(404, "/api/case/1/"), self.endpoint)
+        self.assertIsNone(match_endpoint(404, "/admin/"))
+        self.assertIsNone(match_endpoint(400, "/api/case/1/"))
+        with self.assertNumQueries(0):
+            self.assertEqual(match_endpoint(404, "/api/texts/"), self.endpoint)
+
+        self.endpoint.path_matcher = r"^/api/texts/"
+        self.endpoint.save()
+        self.assertEqual(match_endpoint(404, "/api/case/1/"), other)
+
+    def test_invalid_path_matcher_skipped(self):
+        ProtectedEndpoint.objects.create(
+            path_matcher=r"^/api/(", description="Broken", max_errors=3
+        )
+
+        with self.assertLogs("guard.matcher", level="ERROR"):
+            self.assertEqual(match_endpoint(404, "/api/case/1/"), self.endpoint)
+        self.assertIsNone(match_endpoint(404, "/admin/"))
+
+    def test_purge_endpoint_hits(self):
+        limiter = DatabaseLimiter()
+        for _ in range(3):
+            limiter.hit("ip:1.2.3.4", self.endpoint)
+        limiter.hit("ip:5.6.7.8", self.endpoint)
+
+        old = timezone.now() - datetime.timedelta(days=1)
+        BlockedEndpointHit.objects.exclude(
+            pk=BlockedEndpointHit.objects.latest("pk").pk
+        ).update(hit_at=old)
+
+        self.assertEqual(purge_endpoint_hits(), 3)
+        self.assertEqual(BlockedEndpointHit.objects.count(), 1)
+
+        rollup = EndpointHitRollup.objects.get()
+        self.assertEqual(rollup.identifier, "ip:1.2.3.4")
+        self.assertEqual(rollup.hits, 3)
+        self.assertEqual(rollup.hour, old.replace(minute=0, second=0, microsecond=0))
+
+        self.assertEqual(purge_endpoint_hits(), 0)
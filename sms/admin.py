@@ -7,6 +7,8 @@ from .models import SMSMessage
 
 @admin.register(SMSMessage)
 class SMSMessageAdmin(ModelAdmin):
-    list_display = ("to", "sent_at")
-    readonly_fields = ("to", "sent_at", "response")
+    list_display = ("to", "sent_at", "status")
+    list_filter = ("status",)
+    readonly_fields = ("to", "sent_at", "status", "response", "error")
+    exclude = ("pending_to", "pending_body")
     ordering = ("-sent_at",)
@@ -0,0 +1,40 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("sms", "0002_smsmessage_tenant"),
+    ]
+
+    operations = [
+        # All existing messages were sent synchronously
+        migrations.AddField(
+            model_name="smsmessage",
+            name="status",
+            field=models.CharField(
+                choices=[("queued", "Queued"), ("sent", "Sent"), ("failed", "Failed")],
+                default="sent",
+                max_length=10,
+            ),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name="smsmessage",
+            name="status",
+            field=models.CharField(
+                choices=[("queued", "Queued"), ("sent", "Sent"), ("failed", "Failed")],
+                default="queued",
+                max_length=10,
+            ),
+        ),
+        migrations.AddField(
+            model_name="smsmessage",
+            name="error",
+            field=models.TextField(blank=True),
+        ),
+        migrations.AlterField(
+            model_name="smsmessage",
+            name="response",
+            field=models.JSONField(default=dict),
+        ),
+    ]
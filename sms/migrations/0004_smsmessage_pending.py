@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("sms", "0003_smsmessage_status_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="smsmessage",
+            name="pending_to",
+            field=models.CharField(blank=True, default="", max_length=15),
+        ),
+        migrations.AddField(
+            model_name="smsmessage",
+            name="pending_body",
+            field=models.TextField(blank=True, default=""),
+        ),
+    ]
@@ -3,10 +3,29 @@ from django.db import models
 # Create your models here.
 
 
+class SMSStatus(models.TextChoices):
+    QUEUED = "queued", "Queued"
+    SENT = "sent", "Sent"
+    FAILED = "failed", "Failed"
+
+
+def mask_phone_number(phone_number: str) -> str:
+    return "X" * (len(phone_number) - 4) + phone_number[-4:]
+
+
 class SMSMessage(models.Model):
     to = models.CharField(max_length=15)
     sent_at = models.DateTimeField(auto_now_add=True)
-    response = models.JSONField()
+    response = models.JSONField(default=dict)
+
+    status = models.CharField(
+        max_length=10, choices=SMSStatus.choices, default=SMSStatus.QUEUED
+    )
+    error = models.TextField(blank=True)
+
+    # Number and body of a queued message, cleared once it is sent or failed
+    pending_to = models.CharField(max_length=15, blank=True, default="")
+    pending_body = models.TextField(blank=True, default="")
 
     tenant = models.ForeignKey(
         "tenants.Tenant",
@@ -21,5 +40,5 @@ class SMSMessage(models.Model):
 
     def save(self, *args, **kwargs) -> None:
         # Mask the phone number for privacy
-        self.to = "X" * (len(self.to) - 4) + self.to[-4:]
+        self.to = mask_phone_number(self.to)
         super().save(*args, **kwargs)
@@ -1,10 +1,17 @@
+import threading
+import time
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
+from functools import lru_cache
 
 import requests
 from django.conf import settings
-from tenacity import retry, stop_after_attempt, wait_fixed
+from django.db import transaction
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
 
-from sms.models import SMSMessage
+from sms.models import SMSMessage, SMSStatus, mask_phone_number
 from tenants.models import Tenant
 
 
@@ -21,13 +28,25 @@ class SMSUpStatus(Enum):
     UNKNOWN_ERROR = -99
 
 
-@retry(stop=stop_after_attempt(3), wait=wait_fixed(1))
-def _send_sms(to: str, body: str):
-    headers = {
-        "Authorization": f"Bearer {settings.SMSUP_API_TOKEN}",
-        "Accept": "application/json",
-    }
+class SMSError(Exception):
+    pass
 
+
+@lru_cache(maxsize=1)
+def _session() -> requests.Session:
+    """HTTP session of the process, keeps the connections to SMS Up open."""
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_maxsize=settings.SMS_POOL_SIZE))
+    session.headers.update(
+        {
+            "Authorization": f"Bearer {settings.SMSUP_API_TOKEN}",
+            "Accept": "application/json",
+        }
+    )
+    return session
+
+
+def _send_sms(to: str, body: str):
     if to.startswith("+"):  # API requires no '+' sign
         to = to[1:]
 
@@ -41,11 +60,12 @@ def _send_sms(to: str, body: str):
     if settings.SIMULATE_SMS:
         print(f"Simulating SMS send to {to}: {body}")
 
-    response = requests.get(
-        "https://api.smsup.ch/send/simulate"
-        if settings.SIMULATE_SMS
-        else "https://api.smsup.ch/send",
-        headers=headers,
+    response = _session().get(
+        (
+            "https://api.smsup.ch/send/simulate"
+            if settings.SIMULATE_SMS
+            else "https://api.smsup.ch/send"
+        ),
         params=params,
         timeout=10,
     )
@@ -55,21 +75,119 @@ def _send_sms(to: str, body: str):
     status_code = data.get("status", SMSUpStatus.UNKNOWN_ERROR.value)
 
     if status_code not in [SMSUpStatus.OK.value, SMSUpStatus.MODERATION.value]:
-        raise Exception(f"Failed to send SMS: {data}")
+        raise SMSError(f"Failed to send SMS: {data}")
 
     if data.get("sent") != 1:
-        raise Exception(f"SMS not sent: {data}")
+        raise SMSError(f"SMS not sent: {data}")
 
     return data
 
 
-def send_sms(to: str, body: str, tenant: Tenant) -> None:
-    """Send an SMS message via SMS Up, uses settings from Django settings."""
+def deliver_sms(message_id: int) -> None:
+    """Send a queued message and record the response."""
+    message = SMSMessage.objects.get(pk=message_id)
+    if message.status != SMSStatus.QUEUED:
+        return
+    if not message.pending_to:
+        fail_sms(message_id, "Message has no recipient")
+        return
 
-    data = _send_sms(to, body)
+    data = _send_sms(message.pending_to, message.pending_body)
 
-    SMSMessage.objects.create(
-        to=to,
+    SMSMessage.objects.filter(pk=message_id).update(
+        status=SMSStatus.SENT,
         response=data,
-        tenant=tenant,
+        sent_at=timezone.now(),
+        error="",
+        pending_to="",
+        pending_body="",
     )
+
+
+def fail_sms(message_id: int, error: str) -> None:
+    """Give up on a queued message."""
+    SMSMessage.objects.filter(pk=message_id).update(
+        status=SMSStatus.FAILED, error=error, pending_to="", pending_body=""
+    )
+
+
+def send_sms(to: str, body: str, tenant: Tenant) -> SMSMessage:
+    """Queue an SMS message, it is sent via SMS Up by a worker of the sms queue
+    once the current transaction is committed."""
+    # pylint: disable-next=import-outside-toplevel
+    from sms.tasks import send_sms_task
+
+    # The task only gets the id, the result backend stores its arguments. The
+    # worker reads the number and body from the message.
+    message = SMSMessage.objects.create(
+        to=to, pending_to=to, pending_body=body, tenant=tenant
+    )
+
+    transaction.on_commit(lambda: send_sms_task.delay(message.pk))
+
+    return message
+
+
+class RateLimit:
+    """Spaces calls of all threads to at most `rate` per second."""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate > 0 else 0
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        time.sleep(slot - now)
+
+
+def send_bulk_sms(
+    messages: Iterable[tuple[str, str, Tenant | None]],
+) -> list[SMSMessage]:
+    """Send many (to, body, tenant) messages at once and return the recorded
+    messages in the same order.
+
+    The messages are sent per tenant with SMS_BULK_CONCURRENCY parallel
+    requests, at most SMS_RATE_LIMIT per second overall, and saved once the
+    tenant is done. Failed messages are not retried, their status tells which
+    ones to send again."""
+    messages = list(messages)
+    records = SMSMessage.objects.bulk_create(
+        [
+            SMSMessage(to=mask_phone_number(to), tenant=tenant)
+            for to, _, tenant in messages
+        ]
+    )
+
+    rate_limit = RateLimit(settings.SMS_RATE_LIMIT)
+
+    def deliver(index: int) -> None:
+        to, body, _ = messages[index]
+        record = records[index]
+        rate_limit.wait()
+        try:
+            record.response = _send_sms(to, body)
+        except (requests.RequestException, SMSError, ValueError) as e:
+            record.status = SMSStatus.FAILED
+            record.error = str(e)
+        else:
+            record.status = SMSStatus.SENT
+            record.sent_at = timezone.now()
+
+    by_tenant: dict[int | None, list[int]] = {}
+    for index, (_, _, tenant) in enumerate(messages):
+        by_tenant.setdefault(tenant.pk if tenant else None, []).append(index)
+
+    with ThreadPoolExecutor(settings.SMS_BULK_CONCURRENCY) as pool:
+        for indices in by_tenant.values():
+            list(pool.map(deliver, indices))
+            SMSMessage.objects.bulk_update(
+                [records[index] for index in indices],
+                ["status", "response", "error", "sent_at"],
+                batch_size=500,
+            )
+
+    return records
@@ -1,6 +1,8 @@
+import requests
 from celery import shared_task
+from django.conf import settings
 
-from sms.service import send_sms
+from sms.service import SMSError, deliver_sms, fail_sms, send_sms
 from tenants.models import Tenant
 
 
@@ -12,3 +14,15 @@ def schedule_sms_sending(to_number: str, message: str, tenant_id: int):
         body=message,
         tenant=tenant,
     )
+
+
+@shared_task(bind=True, max_retries=settings.SMS_MAX_RETRIES, ignore_result=True)
+def send_sms_task(self, message_id: int):
+    try:
+        deliver_sms(message_id)
+    except (requests.RequestException, SMSError) as e:
+        if self.request.retries >= self.max_retries:
+            fail_sms(message_id, str(e))
+            raise
+        # Exponential backoff: 2s, 4s, 8s, ...
+        raise self.retry(exc=e, countdown=min(2 ** (self.request.retries + 1), 300))
@@ -1 +1,171 @@
-# Create your tests here.
+import time
+from unittest import mock
+
+import requests
+from celery.exceptions import Retry
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+
+from sms.models import SMSMessage, SMSStatus
+from sms.service import RateLimit, SMSError, deliver_sms, send_bulk_sms, send_sms
+from sms.tasks import send_sms_task
+from tenants.models import Tenant
+
+SENT = {"status": 1, "sent": 1}
+
+
+class SendSMSTest(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username="owner")
+        self.tenant = Tenant.objects.create(name="Test Tenant", owner=user)
+
+    def test_queued_until_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            message = send_sms("+41791234567", "Hello", self.tenant)
+
+        self.assertEqual(len(callbacks), 1)
+
+        message.refresh_from_db()
+        self.assertEqual(message.status, SMSStatus.QUEUED)
+        self.assertEqual(message.to, "XXXXXXXX4567")
+        self.assertEqual(message.pending_to, "+41791234567")
+        self.assertEqual(message.pending_body, "Hello")
+
+    @mock.patch("sms.service._send_sms", return_value=SENT)
+    def test_deliver(self, send):
+        with self.captureOnCommitCallbacks():
+            message = send_sms("+41791234567", "Hello", self.tenant)
+
+        deliver_sms(message.pk)
+        deliver_sms(message.pk)
+
+        send.assert_called_once_with("+41791234567", "Hello")
+        message.refresh_from_db()
+        self.assertEqual(message.status, SMSStatus.SENT)
+        self.assertEqual(message.response, SENT)
+        self.assertEqual(message.pending_to, "")
+        self.assertEqual(message.pending_body, "")
+
+    def test_missing_recipient(self):
+        message = SMSMessage.objects.create(to="+41791234567", tenant=self.tenant)
+
+        deliver_sms(message.pk)
+
+        message.refresh_from_db()
+        self.assertEqual(message.status, SMSStatus.FAILED)
+
+
+class SendSMSTaskTest(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username="owner")
+        tenant = Tenant.objects.create(name="Test Tenant", owner=user)
+        with self.captureOnCommitCallbacks():
+            self.message = send_sms("+41791234567", "Hello", tenant)
+
+    @mock.patch("sms.service._send_sms")
+    def test_retry(self, send):
+        send.side_effect = [requests.ConnectionError("down"), SENT]
+
+        send_sms_task.apply(args=(self.message.pk,))
+
+        self.assertEqual(send.call_count, 2)
+        self.message.refresh_from_db()
+        self.assertEqual(self.message.status, SMSStatus.SENT)
+
+    @mock.patch("sms.service._send_sms", side_effect=requests.ConnectionError("down"))
+    def test_backoff(self, send):
+        with mock.patch.object(send_sms_task, "retry", side_effect=Retry) as retry:
+            send_sms_task.apply(args=(self.message.pk,))
+            send_sms_task.apply(args=(self.message.pk,), retries=2)
+            send_sms_task.apply(args=(self.message.pk,), retries=4)
+
+        countdowns = [call.kwargs["countdown"] for call in retry.call_args_list]
+        self.assertEqual(countdowns, [2, 8, 32])
+        self.message.refresh_from_db()
+        self.assertEqual(self.message.status, SMSStatus.QUEUED)
+
+    @mock.patch("sms.service._send_sms", side_effect=SMSError("rejected"))
+    def test_max_retries(self, send):
+        result = send_sms_task.apply(args=(self.message.pk,))
+
+        self.assertIsInstance(result.result, SMSError)
+        self.assertEqual(send.call_count, settings.SMS_MAX_RETRIES + 1)
+        self.message.refresh_from_db()
+        self.assertEqual(self.message.status, SMSStatus.FAILED)
+        self.assertEqual(self.message.error, "rejected")
+        self.assertEqual(self.message.pending_to, "")
+        self.assertEqual(self.message.pending_body, "")
+
+
+class SendBulkSMSTest(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username="owner")
+        self.first = Tenant.objects.create(name="First", owner=user)
+        self.second = Tenant.objects.create(name="Second", owner=user)
+
+    @mock.patch("sms.service._send_sms")
+    def test_order(self, send):
+        def respond(to, body):
+            if body == "fail":
+                raise SMSError("rejected")
+            return {**SENT, "to": to}
+
+        send.side_effect = respond
+        messages = [
+            ("+41790000001", "ok", self.first),
+            ("+41790000002", "fail", self.second),
+            ("+41790000003", "ok", self.first),
+            ("+41790000004", "ok", None),
+        ]
+
+        records = send_bulk_sms(messages)
+
+        self.assertEqual(
+            [record.to for record in records],
+            ["XXXXXXXX0001", "XXXXXXXX0002", "XXXXXXXX0003", "XXXXXXXX0004"],
+        )
+        self.assertEqual(
+            [record.status for record in records],
+            [SMSStatus.SENT, SMSStatus.FAILED, SMSStatus.SENT, SMSStatus.SENT],
+        )
+        self.assertEqual(records[0].response["to"], "+41790000001")
+        self.assertEqual(records[1].error, "rejected")
+
+    @mock.patch("sms.service._send_sms", return_value=SENT)
+    def test_saved_per_tenant(self, send):
+        messages = [
+            ("+41790000001", "Hello", self.first),
+            ("+41790000002", "Hello", self.second),
+            ("+41790000003", "Hello", self.first),
+        ]
+
+        with mock.patch.object(
+            SMSMessage.objects, "bulk_update", wraps=SMSMessage.objects.bulk_update
+        ) as bulk_update:
+            send_bulk_sms(messages)
+
+        saved = [
+            {record.tenant for record in call.args[0]}
+            for call in bulk_update.call_args_list
+        ]
+        self.assertEqual(saved, [{self.first}, {self.second}])
+        self.assertEqual(
+            SMSMessage.objects.filter(status=SMSStatus.SENT).count(), len(messages)
+        )
+
+
+class RateLimitTest(SimpleTestCase):
+    def test_unlimited(self):
+        rate_limit = RateLimit(0)
+        start = time.monotonic()
+        for _ in range(100):
+            rate_limit.wait()
+        self.assertLess(time.monotonic() - start, 0.1)
+
+    def test_spacing(self):
+        rate_limit = RateLimit(50)
+        start = time.monotonic()
+        for _ in range(6):
+            rate_limit.wait()
+        self.assertGreaterEqual(time.monotonic() - start, 0.1)
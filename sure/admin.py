@@ -230,9 +230,19 @@ class VisitExportAdmin(ModelAdmin):
         "status",
         "start_date",
         "end_date",
+        "mode",
+        "format",
         "download_url",
     )
-    list_filter = ("status", "created_at", "start_date", "end_date", "user")
+    list_filter = (
+        "status",
+        "mode",
+        "format",
+        "created_at",
+        "start_date",
+        "end_date",
+        "user",
+    )
 
     readonly_fields = (
         "created_at",
@@ -241,8 +251,15 @@ class VisitExportAdmin(ModelAdmin):
         "error_message",
         "total_visits",
         "progress",
+        "processed_visits",
+        "started_at",
+        "rows_per_second",
+        "eta",
+        "modified_since",
+        "modified_until",
+        "manifest",
     )
-    exclude = ("user", "file")
+    exclude = ("user", "file", "progress_updated_at")
 
     actions_detail = ["start_export_obj"]
 
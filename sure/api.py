@@ -4,7 +4,7 @@ import phonenumbers
 from django.core.exceptions import ValidationError
 from django.db import transaction
 from django.db.models import F, Func
-from django.http import HttpRequest
+from django.http import HttpRequest, HttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.utils.translation import get_language
@@ -16,11 +16,12 @@ from ninja.pagination import PageNumberPagination, paginate
 
 import tenants.auth
 from core.auth import auth_2fa_or_trusted
+from core.history import batched_history
+from core.query_budget import query_budget
 from sure.cases import (
-    annotate_last_modified,
     get_case_tests_with_latest_results,
     get_test_results,
-    prefetch_questionnaire,
+    touch_visits,
 )
 from sure.client_service import can_connect_case, generate_token
 from sure.client_service import connect_case as connect_case_service
@@ -55,6 +56,8 @@ from sure.models import (
     VisitLog,
     VisitStatus,
 )
+from sure.pagination import KeysetPagination
+from sure.questionnaire_cache import render_questionnaire
 from sure.schema import (
     CaseFilters,
     CaseHistory,
@@ -94,6 +97,13 @@ logger = logging.getLogger(__name__)
 router = Router()
 
 
+def questionnaire_response(questionnaire_id: int, location, internal=False):
+    return HttpResponse(
+        render_questionnaire(questionnaire_id, location, internal),
+        content_type="application/json",
+    )
+
+
 @router.get(
     "/case/{pk}/questionnaire/",
     response={200: QuestionnaireSchema, 302: StatusSchema, 403: StatusSchema},
@@ -116,9 +126,7 @@ def get_case_questionnaire(request, pk: str):  # pylint: disable=unused-argument
                 "success": False,
                 "message": "User does not have access to this case's location",
             }
-        return prefetch_questionnaire(location=visit.case.location, internal=False).get(
-            pk=visit.questionnaire.pk
-        )
+        return questionnaire_response(visit.questionnaire_id, visit.case.location)
 
     # Handle unauthenticated users, case submitted but key not set
     if visit.status == VisitStatus.CLIENT_SUBMITTED and visit.case.key == "":
@@ -135,12 +143,7 @@ def get_case_questionnaire(request, pk: str):  # pylint: disable=unused-argument
         }
 
     # Get questionnaire for clients
-    location = visit.case.location
-    questionnaire = prefetch_questionnaire(location=location, internal=False).get(
-        pk=visit.questionnaire.pk
-    )
-
-    return questionnaire
+    return questionnaire_response(visit.questionnaire_id, visit.case.location)
 
 
 @router.post(
@@ -259,12 +262,10 @@ def get_case_internal(request, pk: str):
     """Get the internal questionnaire associated with a case."""
     visit = get_case(request, pk)
 
-    questionnaire = prefetch_questionnaire(visit.case.location, internal=True).get(
-        pk=visit.questionnaire.pk
+    return questionnaire_response(
+        visit.questionnaire_id, visit.case.location, internal=True
     )
 
-    return questionnaire
-
 
 @router.get("/case/{pk}/phone/", response=StatusSchema)
 def get_phone_number(request, pk: str):
@@ -295,6 +296,7 @@ def get_phone_number(request, pk: str):
 
 @router.get("/case/{pk}/visit/", response=CaseListingSchema)
 @inject_language
+@query_budget(queries=12, rows=50)
 def get_visit(request, pk: str):
     """Get the client answers for a case."""
 
@@ -414,6 +416,8 @@ def update_case_tests(request, pk: str, data: SubmitTestsSchema):
         for test_kind_id in new
     ]
     Test.objects.bulk_create(tests)
+    if tests:
+        touch_visits([visit.pk])
 
     to_remove = (
         Test.objects.filter(visit=visit, test_kind_id__in=removed).exclude(
@@ -432,12 +436,13 @@ def update_case_tests(request, pk: str, data: SubmitTestsSchema):
         )
 
     free_form_tests = data.free_form_tests
-    for test_name in free_form_tests:
-        if test_name.strip() == "":
-            continue
-        FreeFormTest.objects.get_or_create(
-            visit=visit, name=test_name, user=request.user
-        )
+    with batched_history():
+        for test_name in free_form_tests:
+            if test_name.strip() == "":
+                continue
+            FreeFormTest.objects.get_or_create(
+                visit=visit, name=test_name, user=request.user
+            )
 
     to_delete = (
         FreeFormTest.objects.filter(visit=visit)
@@ -553,18 +558,18 @@ def update_case_test_results(request, pk: str, test_results: SubmitTestResultsSc
 
         test.results.create(result_option=option, note=note, user=request.user)
 
-    for free_form_result in test_results.free_form_results:
-        test = visit.free_form_tests.filter(id=free_form_result.id).first()
-        if not test:
-            warnings.append(
-                f"No free form test found with id {free_form_result.id} in case {visit.case.human_id}."
-            )
-            continue
-        test.result = free_form_result.result
-        test.result_recorded_at = timezone.now()
-        test.save(update_fields=["result", "result_recorded_at"])
+    with batched_history():
+        for free_form_result in test_results.free_form_results:
+            test = visit.free_form_tests.filter(id=free_form_result.id).first()
+            if not test:
+                warnings.append(
+                    f"No free form test found with id {free_form_result.id} in case {visit.case.human_id}."
+                )
+                continue
+            test.result = free_form_result.result
+            test.result_recorded_at = timezone.now()
+            test.save(update_fields=["result", "result_recorded_at"])
 
-    with transaction.atomic():
         visit.status = VisitStatus.RESULTS_RECORDED
         visit.save(update_fields=["status"])
     return {"success": True, "warnings": warnings}
@@ -717,15 +722,18 @@ def set_case_key(request, pk: str, key: Form["str"]):
 @inject_language
 def create_case_view(request, data: CreateCaseSchema):
     """Create a new case from a questionnaire."""
-    case = create_case(data.location_id, request.user, data.external_id, data.language)
-    visit = create_visit(
-        case, get_object_or_404(Questionnaire, pk=data.questionnaire_id)
-    )
+    with batched_history():
+        case = create_case(
+            data.location_id, request.user, data.external_id, data.language
+        )
+        visit = create_visit(
+            case, get_object_or_404(Questionnaire, pk=data.questionnaire_id)
+        )
 
-    visit.logs.create(
-        action="Case created",
-        user=request.user,
-    )
+        visit.logs.create(
+            action="Case created",
+            user=request.user,
+        )
 
     link = get_case_link(case)
 
@@ -740,6 +748,20 @@ def create_case_view(request, data: CreateCaseSchema):
     return CreateCaseResponse(link=link, case_id=case.human_id)
 
 
+def get_case_list(request, filters: CaseFilters):
+    consultant = get_object_or_404(Consultant, user=request.user)
+    django_filters = filters.get_django_filters()
+
+    return (
+        Visit.objects.filter(case__location__in=consultant.locations.all())
+        .select_related(
+            "case", "case__connection", "case__connection__client", "case__location"
+        )
+        .order_by("-last_modified_at")
+        .filter(django_filters)
+    )
+
+
 @router.post(
     "/cases/",
     response=list[CaseListingSchema],
@@ -747,24 +769,24 @@ def create_case_view(request, data: CreateCaseSchema):
 )
 @inject_language
 @paginate(PageNumberPagination, page_size=20)
+@query_budget(queries=12, rows=100)
 def list_cases(request, filters: CaseFilters):
     """List all cases the user has access to."""
-    consultant = get_object_or_404(Consultant, user=request.user)
-    django_filters = filters.get_django_filters()
+    return get_case_list(request, filters)
 
-    visits = (
-        annotate_last_modified(
-            Visit.objects.filter(case__location__in=consultant.locations.all())
-            .select_related(
-                "case", "questionnaire", "case__connection", "case__location"
-            )
-            .prefetch_related("client_answers", "consultant_answers", "tests")
-        )
-        .order_by("-last_modified_at")
-        .filter(django_filters)
-    )
 
-    return visits
+@router.post(
+    "/cases/cursor/",
+    response=list[CaseListingSchema],
+    auth=[auth_2fa_or_trusted, tenants.auth.auth_tenant_api_token],
+)
+@inject_language
+@paginate(KeysetPagination)
+@query_budget(queries=10, rows=100)
+def list_cases_cursor(request, filters: CaseFilters):
+    """List all cases the user has access to, paginated by a cursor on
+    (last_modified_at, id)."""
+    return get_case_list(request, filters)
 
 
 @router.get("/case/status/options/", response=list[OptionSchema])
@@ -812,6 +834,7 @@ def list_client_cases(request, pk: str):
 
 @router.get("/questionnaires/", response=list[QuestionnaireListingSchema], auth=None)
 @inject_language
+@query_budget(queries=4)
 def list_questionnaires(request):  # pylint: disable=unused-argument
     """List all questionnaires."""
     questionnaires = Questionnaire.objects.all().only("id", "name")
@@ -820,6 +843,7 @@ def list_questionnaires(request):  # pylint: disable=unused-argument
 
 @router.get("/tests/", response=list[TestCategorySchema])
 @inject_language
+@query_budget(queries=10)
 def list_tests(request):  # pylint: disable=unused-argument
     """List all tests."""
     return TestCategory.objects.prefetch_related(
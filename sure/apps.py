@@ -13,6 +13,9 @@ class SureConfig(AppConfig):
 
         from core.admin import admin_site  # pylint: disable=import-outside-toplevel
 
+        # pylint: disable-next=import-outside-toplevel,unused-import
+        from sure import signals  # noqa: F401
+
         admin.site = admin_site
         sites.site = admin_site
         return super().ready()
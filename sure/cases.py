@@ -1,9 +1,22 @@
 from typing import Any, Dict, List, Optional, Tuple
 
-from django.db.models import Count, F, OuterRef, Prefetch, Q, QuerySet, Subquery
+from django.db import connection, transaction
+from django.db.models import (
+    Count,
+    F,
+    Max,
+    Min,
+    OuterRef,
+    Prefetch,
+    Q,
+    QuerySet,
+    Subquery,
+)
 from django.db.models.functions import Greatest
+from django.utils import timezone
 from django.utils.timezone import make_naive
 
+from sure.export_layout import QuestionLayout, QuestionnaireLayout, get_layout
 from sure.forms import CohortFilterForm
 from sure.models import (
     ClientAnswer,
@@ -18,22 +31,19 @@ from sure.models import (
     TestKind,
     TestResult,
     Visit,
+    VisitLog,
     VisitStatus,
 )
 from tenants.models import Location, Tenant
 
 
-def annotate_last_modified(queryset: QuerySet[Visit]) -> QuerySet[Visit]:
-    """Annotates each Visit with its last_modified timestamp, which is the
-    latest created_at among:
+def last_modified_expression() -> Greatest:
+    """The latest created_at among:
     - The Visit itself
     - Related ClientAnswers
     - Related ConsultantAnswers
     - Related Tests
     - Related TestResults (through Tests)
-
-    Returns:
-        QuerySet[Visit]: The Visit queryset with last_modified annotation
     """
     latest_client_answer = (
         ClientAnswer.objects.filter(visit=OuterRef("pk"))
@@ -59,17 +69,97 @@ def annotate_last_modified(queryset: QuerySet[Visit]) -> QuerySet[Visit]:
         .values("created_at")[:1]
     )
 
-    return queryset.annotate(
-        last_modified_at=Greatest(
-            F("created_at"),
-            Subquery(latest_client_answer),
-            Subquery(latest_consultant_answer),
-            Subquery(latest_test),
-            Subquery(latest_test_result),
-        )
+    return Greatest(
+        F("created_at"),
+        Subquery(latest_client_answer),
+        Subquery(latest_consultant_answer),
+        Subquery(latest_test),
+        Subquery(latest_test_result),
     )
 
 
+def backfill_last_modified(queryset: QuerySet[Visit], batch_size: int = 5000) -> int:
+    """Recompute the stored last_modified_at of the visits from their related
+    rows, returns the number of updated visits.
+
+    The visits are updated in ranges of batch_size consecutive pks, one query
+    each."""
+    bounds = queryset.aggregate(low=Min("pk"), high=Max("pk"))
+    if bounds["low"] is None:
+        return 0
+
+    updated = 0
+    for start in range(bounds["low"], bounds["high"] + 1, batch_size):
+        updated += queryset.filter(pk__gte=start, pk__lt=start + batch_size).update(
+            last_modified_at=last_modified_expression()
+        )
+    return updated
+
+
+def touch_visits(visit_ids, timestamp=None) -> int:
+    """Move last_modified_at of the visits forward to timestamp (default now).
+
+    Called whenever answers, tests or results are written, see
+    :mod:`sure.signals`. Writes through bulk_create don't send signals and
+    have to call this explicitly."""
+    timestamp = timestamp or timezone.now()
+    return Visit.objects.filter(
+        pk__in=visit_ids, last_modified_at__lt=timestamp
+    ).update(last_modified_at=timestamp)
+
+
+def transition_visits(
+    queryset: QuerySet[Visit], status: VisitStatus, user=None, reason: str = ""
+) -> list[Visit]:
+    """Move all visits of the queryset to the status and return them.
+
+    A single UPDATE ... RETURNING changes the visits, applying the published_at
+    rules of Visit.save, followed by one insert each for their history and
+    VisitLog rows."""
+    published = [VisitStatus.RESULTS_SENT, VisitStatus.RESULTS_SEEN]
+    now = timezone.now()
+
+    published_at = "published_at"
+    params: list[Any] = [str(status)]
+    if status in published:
+        published_at = "COALESCE(published_at, %s)"
+        params.append(now)
+    elif status != VisitStatus.CLOSED:
+        published_at = "NULL"
+
+    select, select_params = queryset.values("pk").query.sql_with_params()
+    table = connection.ops.quote_name(Visit._meta.db_table)
+
+    with transaction.atomic():
+        visits = list(
+            Visit.objects.raw(
+                f"UPDATE {table} SET status = %s, published_at = {published_at} "
+                f"WHERE id IN ({select}) RETURNING *",
+                [*params, *select_params],
+            )
+        )
+        Visit.history.bulk_history_create(
+            visits,
+            update=True,
+            default_user=user,
+            default_change_reason=reason,
+            default_date=now,
+        )
+        VisitLog.objects.bulk_create(
+            [
+                VisitLog(
+                    visit_id=visit.pk,
+                    action=f"Status changed to {status}",
+                    user=user,
+                )
+                for visit in visits
+            ],
+            batch_size=1000,
+        )
+
+    return visits
+
+
 def annotate_latest_result(queryset: QuerySet[Test]) -> QuerySet[Test]:
     """Annotates each Test with its latest_result (TestResult).
 
@@ -193,28 +283,36 @@ def get_export_dict(visit: Visit):
     if hasattr(visit.case, "connection"):
         record["client_id"] = visit.case.connection.client_id
 
-    record.update(get_client_answers_export(visit))
-    record.update(get_consultant_answers_export(visit))
+    layout = get_layout(visit.questionnaire_id)
+    record.update(get_client_answers_export(visit, layout))
+    record.update(get_consultant_answers_export(visit, layout))
     record.update(get_test_results_export(visit))
 
     return record
 
 
-def show_question(question, answers):
-    if not question.show_for_options.exists():
+def show_question(question: QuestionLayout, answers):
+    if not question.show_for:
         return True
 
-    for option in question.show_for_options.all():
-        option: ClientOption = option
-        answer = answers.get(option.question.code, None)
+    for parent_code, option_code in question.show_for:
+        answer = answers.get(parent_code, None)
         if not answer:
             continue
-        if option.code in answer["codes"]:
+        # Answer codes are stored as integers, option codes as strings
+        if option_code in map(str, answer["codes"]):
             return True
 
     return False
 
 
+def latest_answers(answers) -> dict[int, ClientAnswer | ConsultantAnswer]:
+    """Map question ids to their newest answer."""
+    return {
+        answer.question_id: answer for answer in answers.order_by("created_at", "pk")
+    }
+
+
 def get_answer_codes(codes):
     if len(codes) == 0:
         return 99
@@ -235,30 +333,28 @@ def get_answer_texts(texts):
     return ";".join(map(str, texts))
 
 
-def get_client_answers_export(visit: Visit):
+def get_client_answers_export(visit: Visit, layout: QuestionnaireLayout | None = None):
+    if layout is None:
+        layout = get_layout(visit.questionnaire_id)
+    latest = latest_answers(visit.client_answers.all())
+
     answers = {}
-    for section in visit.questionnaire.sections.all():
-        for question in section.client_questions.all():
-            question: ClientQuestion = question
-
-            if not show_question(question, answers):
-                continue
-
-            answer_qs = ClientAnswer.objects.filter(
-                visit=visit, question=question
-            ).order_by("-created_at")
-            if not answer_qs.exists():
-                answer_record = {
-                    "codes": [99],
-                    "texts": ["missing"],
-                }
-            else:
-                answer = answer_qs[0]
-                answer_record = {
-                    "codes": answer.choices,
-                    "texts": answer.texts,
-                }
-            answers[question.code] = answer_record
+    for question in layout.client_questions:
+        if not show_question(question, answers):
+            continue
+
+        answer = latest.get(question.id)
+        if answer is None:
+            answer_record = {
+                "codes": [99],
+                "texts": ["missing"],
+            }
+        else:
+            answer_record = {
+                "codes": answer.choices,
+                "texts": answer.texts,
+            }
+        answers[question.code] = answer_record
 
     output = {}
     for question_code, answer in answers.items():
@@ -267,21 +363,22 @@ def get_client_answers_export(visit: Visit):
     return output
 
 
-def get_consultant_answers_export(visit: Visit):
-    output = {}
-    for question in visit.questionnaire.consultant_questions.all():
-        question: ConsultantQuestion = question
+def get_consultant_answers_export(
+    visit: Visit, layout: QuestionnaireLayout | None = None
+):
+    if layout is None:
+        layout = get_layout(visit.questionnaire_id)
+    latest = latest_answers(visit.consultant_answers.all())
 
-        answer_qs = ConsultantAnswer.objects.filter(
-            visit=visit, question=question
-        ).order_by("-created_at")
-        if not answer_qs.exists():
+    output = {}
+    for question in layout.consultant_questions:
+        answer = latest.get(question.id)
+        if answer is None:
             answer_record = {
                 "codes": [99],
                 "texts": ["missing"],
             }
         else:
-            answer = answer_qs[0]
             answer_record = {
                 "codes": answer.choices,
                 "texts": answer.texts,
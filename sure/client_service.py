@@ -1,6 +1,7 @@
 """Functions for creating and managing clients and their cases."""
 
 import logging
+from dataclasses import dataclass
 from datetime import timedelta
 from typing import Iterable
 
@@ -12,8 +13,11 @@ from django.shortcuts import get_object_or_404
 from django.utils import timezone
 
 import tenants.models
+from core.history import batched_history
 from sms.service import send_sms
-from sure.cases import annotate_last_modified
+from sure.cases import touch_visits
+from sure.export_layout import get_layout
+from sure.reminder import get_reminder_date
 from sure.schema import AnswerSchema
 from texts.translate import translate
 
@@ -23,6 +27,7 @@ from .models import (
     ClientAnswer,
     Connection,
     ConsentChoice,
+    ConsultantAnswer,
     Contact,
     Questionnaire,
     Visit,
@@ -246,37 +251,47 @@ def get_client_by_id(client_id: str, case_id: str):
     return connection.client
 
 
-def record_client_answers(
-    visit: Visit, answers: list[AnswerSchema], user: User | None = None
-):
-    """Record answers for a visit."""
-    if user is None and visit.status != VisitStatus.CREATED:
-        raise ValueError(
-            "Cannot record answers for a visit that is not in the CREATED status"
-        )
+@dataclass
+class AnswerChange:
+    """A recorded answer, previous is None if the question was not answered."""
+
+    question_id: int
+    code: str
+    previous: list[int] | None
+    choices: list[int]
+
+
+def record_answers(
+    visit: Visit,
+    answers: list[AnswerSchema],
+    model: type[ClientAnswer] | type[ConsultantAnswer],
+    user: User | None = None,
+) -> list[AnswerChange]:
+    """Record the answers that differ from the current ones and log them.
 
+    The new answers are inserted at once, in one transaction with the log."""
     current_answers = (
-        visit.client_answers.all()
+        model.objects.filter(visit=visit)
         .order_by("question_id", "-created_at")
         .distinct("question_id")
     )
     current_answer_map = {ans.question_id: ans for ans in current_answers}
 
     created_answers = []
-
     for answer in answers:
         choices = [int(choice.code) for choice in answer.choices]
         texts = [choice.text or "-" for choice in answer.choices]
 
-        if answer.questionId in current_answer_map:
-            existing_answer = current_answer_map[answer.questionId]
-            if _compare_lists(existing_answer.choices, choices) and _compare_lists(
-                existing_answer.texts, texts
-            ):
-                continue
+        existing_answer = current_answer_map.get(answer.questionId)
+        if (
+            existing_answer is not None
+            and _compare_lists(existing_answer.choices, choices)
+            and _compare_lists(existing_answer.texts, texts)
+        ):
+            continue
 
         created_answers.append(
-            ClientAnswer(
+            model(
                 visit=visit,
                 question_id=answer.questionId,
                 choices=choices,
@@ -285,11 +300,57 @@ def record_client_answers(
             )
         )
 
+    if not created_answers:
+        return []
+
+    # The question codes come from the cached layout of the questionnaire
+    layout = get_layout(visit.questionnaire_id)
+    if model is ClientAnswer:
+        label, questions = "Client answers", layout.client_questions
+    else:
+        label, questions = "Consultant answers", layout.consultant_questions
+    codes = {question.id: question.code for question in questions}
+
+    changes = [
+        AnswerChange(
+            question_id=answer.question_id,
+            code=codes.get(answer.question_id, ""),
+            previous=(
+                current_answer_map[answer.question_id].choices
+                if answer.question_id in current_answer_map
+                else None
+            ),
+            choices=answer.choices,
+        )
+        for answer in created_answers
+    ]
+
     with transaction.atomic():
-        ClientAnswer.objects.bulk_create(created_answers)
+        model.objects.bulk_create(created_answers)
+        touch_visits([visit.pk])
+        visit.logs.create(
+            action=f"{label} recorded: " + ", ".join(change.code for change in changes),
+            user=user,
+        )
+    return changes
+
+
+def record_client_answers(
+    visit: Visit, answers: list[AnswerSchema], user: User | None = None
+) -> list[AnswerChange]:
+    """Record answers for a visit."""
+    if user is None and visit.status != VisitStatus.CREATED:
+        raise ValueError(
+            "Cannot record answers for a visit that is not in the CREATED status"
+        )
+
+    with batched_history():
+        changes = record_answers(visit, answers, ClientAnswer, user)
         visit.status = VisitStatus.CLIENT_SUBMITTED
         visit.save(update_fields=["status"])
 
+    return changes
+
 
 def _compare_lists(list1: list, list2: list) -> bool:
     """Compare two lists for equality, ignoring order."""
@@ -304,33 +365,17 @@ def record_consultant_answers(visit: Visit, answers: list[AnswerSchema], user: U
             "Recording consultant answers for a visit that is not in the CLIENT_SUBMITTED status"
         )
 
-    current_answers = (
-        visit.consultant_answers.all()
-        .order_by("question_id", "-created_at")
-        .distinct("question_id")
-        .prefetch_related("question")
-    )
+    with batched_history():
+        changes = record_answers(visit, answers, ConsultantAnswer, user)
 
-    current_answer_map = {ans.question.pk: ans for ans in current_answers}
+        update_fields = ["status"]
+        if changes:
+            # The reminder is due relative to the latest REMINDER answer
+            visit.next_reminder_at = get_reminder_date(visit)
+            update_fields.append("next_reminder_at")
 
-    for answer in answers:
-        choices = [int(choice.code) for choice in answer.choices]
-        texts = [choice.text or "-" for choice in answer.choices]
-        if answer.questionId in current_answer_map:
-            existing_answer = current_answer_map[answer.questionId]
-            if _compare_lists(existing_answer.choices, choices) and _compare_lists(
-                existing_answer.texts, texts
-            ):
-                continue
-        visit.consultant_answers.create(
-            question_id=answer.questionId,
-            choices=choices,
-            texts=texts,
-            user=user,
-        )
-    with transaction.atomic():
         visit.status = VisitStatus.CONSULTANT_SUBMITTED
-        visit.save(update_fields=["status"])
+        visit.save(update_fields=update_fields)
 
     return warnings
 
@@ -338,7 +383,9 @@ def record_consultant_answers(visit: Visit, answers: list[AnswerSchema], user: U
 def get_case(request, pk):
     pk = strip_id(pk)
 
-    visit = get_object_or_404(annotate_last_modified(Visit.objects.all()), case_id=pk)
+    visit = get_object_or_404(
+        Visit.objects.select_related("case", "case__location"), case_id=pk
+    )
 
     if request.user.is_superuser:
         return visit
@@ -359,7 +406,7 @@ def get_case(request, pk):
 def get_case_unverified(pk, key: str = ""):
     pk = strip_id(pk)
 
-    visit = get_object_or_404(annotate_last_modified(Visit.objects.all()), case_id=pk)
+    visit = get_object_or_404(Visit, case_id=pk)
 
     if not visit.case.has_key():
         return visit
@@ -12,6 +12,7 @@ from django.utils.translation import activate, get_language
 from markdown_pdf import MarkdownPdf
 from markdown_pdf import Section as MDSection
 
+from core.progress import ProgressReporter
 from sure.models import ClientQuestion, ConsultantQuestion, Questionnaire, Section
 
 MD_CSS = """
@@ -111,7 +112,9 @@ def generate_consultant_markdown(questionnaire: Questionnaire):
     return md.build_pdf()
 
 
-def generate_pdfs(questionnaire: Questionnaire):
+def generate_pdfs(
+    questionnaire: Questionnaire, progress: ProgressReporter | None = None
+):
     for language in settings.LANGUAGES:
         activate(language[0])
         questionnaire = Questionnaire.objects.get(
@@ -134,3 +137,6 @@ def generate_pdfs(questionnaire: Questionnaire):
             save=False,
         )
         questionnaire.save()
+
+        if progress:
+            progress.advance()
@@ -0,0 +1,117 @@
+"""Compiled export layouts of questionnaires.
+
+A layout holds the ordered question codes of a questionnaire together with the
+options their visibility depends on, so exporting a visit needs no further
+questionnaire queries. Layouts are cached, every change to a questionnaire
+bumps the cache version (see :mod:`sure.signals`)."""
+
+from dataclasses import dataclass, field
+
+from django.core.cache import cache
+from django.utils.translation import get_language
+
+from core.cache_version import bump_version, get_version
+from sure.models import ClientQuestion, ConsultantQuestion, Questionnaire
+
+LAYOUT_VERSION_KEY = "export_layout:version"
+
+
+@dataclass
+class QuestionLayout:
+    id: int
+    code: str
+    # (parent question code, option code) pairs, the question is only shown
+    # if the parent question was answered with one of these options.
+    show_for: list[tuple[str, str]] = field(default_factory=list)
+
+
+@dataclass
+class QuestionnaireLayout:
+    id: int
+    name: str
+    client_questions: list[QuestionLayout] = field(default_factory=list)
+    consultant_questions: list[QuestionLayout] = field(default_factory=list)
+
+    @property
+    def columns(self) -> list[str]:
+        """Names of the answer columns, in export order."""
+        return [
+            f"{question.code}_{suffix}"
+            for question in self.client_questions + self.consultant_questions
+            for suffix in ("codes", "texts")
+        ]
+
+
+def compile_layouts(questionnaire_ids) -> dict[int, QuestionnaireLayout]:
+    """Load the ordered client and consultant questions of the questionnaires."""
+    layouts = {
+        questionnaire.pk: QuestionnaireLayout(
+            id=questionnaire.pk, name=questionnaire.name
+        )
+        for questionnaire in Questionnaire.objects.filter(pk__in=questionnaire_ids)
+    }
+
+    show_for: dict[int, list[tuple[str, str]]] = {}
+    for row in ClientQuestion.show_for_options.through.objects.filter(
+        clientquestion__section__questionnaire_id__in=questionnaire_ids
+    ).values_list(
+        "clientquestion_id", "clientoption__question__code", "clientoption__code"
+    ):
+        show_for.setdefault(row[0], []).append((row[1], row[2]))
+
+    client_questions = (
+        ClientQuestion.objects.filter(section__questionnaire_id__in=questionnaire_ids)
+        .order_by("section__order", "section_id", "order", "pk")
+        .values_list("pk", "code", "section__questionnaire_id")
+    )
+    for pk, code, questionnaire_id in client_questions:
+        layouts[questionnaire_id].client_questions.append(
+            QuestionLayout(id=pk, code=code, show_for=show_for.get(pk, []))
+        )
+
+    consultant_questions = (
+        ConsultantQuestion.objects.filter(questionnaire_id__in=questionnaire_ids)
+        .order_by("order", "pk")
+        .values_list("pk", "code", "questionnaire_id")
+    )
+    for pk, code, questionnaire_id in consultant_questions:
+        layouts[questionnaire_id].consultant_questions.append(
+            QuestionLayout(id=pk, code=code)
+        )
+
+    return layouts
+
+
+def layout_version() -> int:
+    return get_version(LAYOUT_VERSION_KEY)
+
+
+def invalidate_layouts() -> None:
+    bump_version(LAYOUT_VERSION_KEY)
+
+
+def load_layouts(questionnaire_ids) -> dict[int, QuestionnaireLayout]:
+    """Cached version of :func:`compile_layouts`."""
+    version = layout_version()
+    # The questionnaire name is translated
+    keys = {
+        f"export_layout:{version}:{get_language()}:{pk}": pk for pk in questionnaire_ids
+    }
+
+    cached = cache.get_many(keys)
+    layouts = {keys[key]: layout for key, layout in cached.items()}
+
+    missing = [pk for key, pk in keys.items() if key not in cached]
+    if missing:
+        compiled = compile_layouts(missing)
+        cache.set_many(
+            {key: compiled[pk] for key, pk in keys.items() if pk in compiled},
+            timeout=60 * 60 * 24,
+        )
+        layouts.update(compiled)
+
+    return layouts
+
+
+def get_layout(questionnaire_id: int) -> QuestionnaireLayout:
+    return load_layouts([questionnaire_id])[questionnaire_id]
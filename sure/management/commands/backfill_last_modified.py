@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from sure.cases import backfill_last_modified
+from sure.models import Visit
+
+
+class Command(BaseCommand):
+    help = "Recompute the stored last_modified_at of visits from their answers, tests and results."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Range of visit pks updated per query.",
+        )
+
+    def handle(self, *args, **options):
+        updated = backfill_last_modified(
+            Visit.objects.all(), batch_size=options["batch_size"]
+        )
+
+        self.stdout.write(self.style.SUCCESS(f"Updated {updated} visits."))
@@ -0,0 +1,33 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("sure", "0051_alter_token_token"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="visitexport",
+            name="processed_visits",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Number of visits processed so far",
+                verbose_name="Processed Visits",
+            ),
+        ),
+        migrations.AddField(
+            model_name="visitexport",
+            name="started_at",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="Started At"
+            ),
+        ),
+        migrations.AddField(
+            model_name="visitexport",
+            name="progress_updated_at",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="Progress Updated At"
+            ),
+        ),
+    ]
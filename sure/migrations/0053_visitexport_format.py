@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("sure", "0052_visitexport_processed_visits_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="visitexport",
+            name="format",
+            field=models.CharField(
+                choices=[
+                    ("xlsx", "Excel (xlsx)"),
+                    ("parquet", "Parquet"),
+                    ("arrow", "Arrow IPC"),
+                    ("csv.gz", "CSV (gzip)"),
+                ],
+                default="xlsx",
+                help_text="Excel files are limited to about one million rows, use Parquet or Arrow for large exports",
+                max_length=10,
+                verbose_name="Format",
+            ),
+        ),
+    ]
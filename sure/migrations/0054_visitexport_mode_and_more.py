@@ -0,0 +1,51 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("sure", "0053_visitexport_format"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="visitexport",
+            name="mode",
+            field=models.CharField(
+                choices=[("full", "Full"), ("incremental", "Incremental")],
+                default="full",
+                help_text="Incremental exports only contain visits of the date range that changed since the last incremental export",
+                max_length=20,
+                verbose_name="Mode",
+            ),
+        ),
+        migrations.AddField(
+            model_name="visitexport",
+            name="modified_since",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Lower bound (exclusive) of the last modification of exported visits",
+                null=True,
+                verbose_name="Modified Since",
+            ),
+        ),
+        migrations.AddField(
+            model_name="visitexport",
+            name="modified_until",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Upper bound (inclusive) of the last modification of exported visits",
+                null=True,
+                verbose_name="Modified Until",
+            ),
+        ),
+        migrations.AddField(
+            model_name="visitexport",
+            name="manifest",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                help_text="Description of the exported file and its watermarks",
+                verbose_name="Manifest",
+            ),
+        ),
+    ]
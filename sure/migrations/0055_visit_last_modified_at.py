@@ -0,0 +1,69 @@
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F, Max, Min, OuterRef, Subquery
+from django.db.models.functions import Greatest
+
+# Copy of sure.cases.backfill_last_modified as of this migration, it must not
+# depend on the current app code.
+BATCH_SIZE = 5000
+
+
+def backfill_last_modified(apps, schema_editor):
+    Visit = apps.get_model("sure", "Visit")
+    ClientAnswer = apps.get_model("sure", "ClientAnswer")
+    ConsultantAnswer = apps.get_model("sure", "ConsultantAnswer")
+    Test = apps.get_model("sure", "Test")
+    TestResult = apps.get_model("sure", "TestResult")
+
+    def latest(queryset):
+        return Subquery(queryset.order_by("-created_at").values("created_at")[:1])
+
+    last_modified = Greatest(
+        F("created_at"),
+        latest(ClientAnswer.objects.filter(visit=OuterRef("pk"))),
+        latest(ConsultantAnswer.objects.filter(visit=OuterRef("pk"))),
+        latest(Test.objects.filter(visit=OuterRef("pk"))),
+        latest(TestResult.objects.filter(test__visit=OuterRef("pk"))),
+    )
+
+    bounds = Visit.objects.aggregate(low=Min("pk"), high=Max("pk"))
+    if bounds["low"] is None:
+        return
+    for start in range(bounds["low"], bounds["high"] + 1, BATCH_SIZE):
+        Visit.objects.filter(pk__gte=start, pk__lt=start + BATCH_SIZE).update(
+            last_modified_at=last_modified
+        )
+
+
+class Migration(migrations.Migration):
+    # Every batch of the backfill is committed on its own instead of locking
+    # all visits until the end
+    atomic = False
+
+    dependencies = [
+        ("sure", "0054_visitexport_mode_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="historicalvisit",
+            name="last_modified_at",
+            field=models.DateTimeField(
+                db_index=True,
+                default=django.utils.timezone.now,
+                help_text="Timestamp of the latest answer, test or test result",
+                verbose_name="Last Modified At",
+            ),
+        ),
+        migrations.AddField(
+            model_name="visit",
+            name="last_modified_at",
+            field=models.DateTimeField(
+                db_index=True,
+                default=django.utils.timezone.now,
+                help_text="Timestamp of the latest answer, test or test result",
+                verbose_name="Last Modified At",
+            ),
+        ),
+        migrations.RunPython(backfill_last_modified, migrations.RunPython.noop),
+    ]
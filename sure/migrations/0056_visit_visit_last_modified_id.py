@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("sure", "0055_visit_last_modified_at"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="visit",
+            index=models.Index(
+                fields=["-last_modified_at", "-id"], name="visit_last_modified_id"
+            ),
+        ),
+    ]
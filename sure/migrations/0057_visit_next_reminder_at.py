@@ -0,0 +1,109 @@
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+# Copies of sure.reminder as of this migration, it must not depend on the
+# current app code.
+REMINDER_QUESTION_LABEL = "REMINDER"
+
+
+def parse_duration_string(duration_str: str) -> timedelta:
+    number, unit = duration_str.strip().split(" ", 1)
+    if not number.isdigit():
+        raise ValueError(f"Invalid duration string: {duration_str}")
+    number = int(number)
+
+    if unit.startswith("week"):
+        return timedelta(weeks=number)
+    if unit.startswith("day"):
+        return timedelta(days=number)
+    if unit.startswith("month"):
+        return timedelta(weeks=number * 4)
+    if unit.startswith("year"):
+        return timedelta(weeks=number * 52)
+
+    raise ValueError(f"Invalid duration string: {duration_str}")
+
+
+def backfill_next_reminder_at(apps, schema_editor):
+    Visit = apps.get_model("sure", "Visit")
+    ConsultantAnswer = apps.get_model("sure", "ConsultantAnswer")
+    ConsultantOption = apps.get_model("sure", "ConsultantOption")
+
+    durations = {}
+    for option in ConsultantOption.objects.filter(
+        question__code=REMINDER_QUESTION_LABEL
+    ):
+        try:
+            durations[option.question_id, option.code] = parse_duration_string(
+                option.text_en
+            )
+        except ValueError:
+            pass
+
+    latest_answer = ConsultantAnswer.objects.filter(
+        visit=OuterRef("pk"), question__code=REMINDER_QUESTION_LABEL
+    ).order_by("-created_at")
+    visits = Visit.objects.filter(
+        no_reminder=False, reminder_sent_at__isnull=True
+    ).annotate(
+        reminder_question_id=Subquery(latest_answer.values("question_id")[:1]),
+        reminder_choices=Subquery(latest_answer.values("choices")[:1]),
+        reminder_answered_at=Subquery(latest_answer.values("created_at")[:1]),
+    )
+
+    scheduled = []
+    for visit in visits.filter(reminder_question_id__isnull=False):
+        if len(visit.reminder_choices) != 1:
+            continue
+        duration = durations.get(
+            (visit.reminder_question_id, str(visit.reminder_choices[0]))
+        )
+        if duration is not None:
+            visit.next_reminder_at = visit.reminder_answered_at + duration
+            scheduled.append(visit)
+
+    Visit.objects.bulk_update(scheduled, ["next_reminder_at"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("sure", "0056_visit_visit_last_modified_id"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="historicalvisit",
+            name="next_reminder_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="When the reminder is due, set from the REMINDER answer",
+                null=True,
+                verbose_name="Next Reminder At",
+            ),
+        ),
+        migrations.AddField(
+            model_name="visit",
+            name="next_reminder_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="When the reminder is due, set from the REMINDER answer",
+                null=True,
+                verbose_name="Next Reminder At",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="visit",
+            index=models.Index(
+                condition=models.Q(
+                    ("next_reminder_at__isnull", False),
+                    ("no_reminder", False),
+                    ("reminder_sent_at__isnull", True),
+                ),
+                fields=["next_reminder_at"],
+                name="visit_next_reminder_due",
+            ),
+        ),
+        migrations.RunPython(backfill_next_reminder_at, migrations.RunPython.noop),
+    ]
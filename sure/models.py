@@ -24,7 +24,8 @@ from django.utils.translation import gettext_lazy as _
 from django_clamd.validators import validate_file_infection
 from html_sanitizer import Sanitizer
 from markdown import markdown
-from simple_history.models import HistoricalRecords
+
+from core.history import BatchedHistoricalRecords
 
 BASE_34 = "1234567890abcdefghijkmnopqrstuvwxyz"
 DIGITS = "0123456789"
@@ -86,7 +87,7 @@ class Case(models.Model):
         help_text=_("An optional access key for the case data"),
     )
 
-    history = HistoricalRecords()
+    history = BatchedHistoricalRecords()
 
     def set_key(self, key: str):
         """Set the access key for the case."""
@@ -593,6 +594,7 @@ class ConsultantAnswer(BaseAnswer):
     question = models.ForeignKey(
         ConsultantQuestion, on_delete=models.CASCADE, related_name="answers"
     )
+    question_id: int
     visit = models.ForeignKey(
         "Visit", on_delete=models.CASCADE, related_name="consultant_answers"
     )
@@ -768,6 +770,7 @@ class Visit(models.Model):
     questionnaire = models.ForeignKey(
         Questionnaire, on_delete=models.CASCADE, related_name="visits"
     )
+    questionnaire_id: int
     created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Created At"))
 
     published_at = models.DateTimeField(
@@ -801,8 +804,22 @@ class Visit(models.Model):
         help_text=_("Whether to skip sending reminders for this visit"),
     )
 
+    next_reminder_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name=_("Next Reminder At"),
+        help_text=_("When the reminder is due, set from the REMINDER answer"),
+    )
+
     tags = ArrayField(models.CharField(max_length=50), blank=True, default=list)
 
+    last_modified_at = models.DateTimeField(
+        default=timezone.now,
+        db_index=True,
+        verbose_name=_("Last Modified At"),
+        help_text=_("Timestamp of the latest answer, test or test result"),
+    )
+
     @property
     def results_visible_for_client(self) -> bool:
         return self.status in [VisitStatus.RESULTS_SENT, VisitStatus.RESULTS_SEEN]
@@ -835,7 +852,25 @@ class Visit(models.Model):
     free_form_tests: models.QuerySet["FreeFormTest"]
     logs: models.QuerySet["VisitLog"]
 
-    history = HistoricalRecords()
+    history = BatchedHistoricalRecords()
+
+    class Meta:
+        indexes = [
+            # Case list ordering and its keyset pagination
+            models.Index(
+                fields=["-last_modified_at", "-id"], name="visit_last_modified_id"
+            ),
+            # Scan of the due reminders
+            models.Index(
+                fields=["next_reminder_at"],
+                name="visit_next_reminder_due",
+                condition=models.Q(
+                    next_reminder_at__isnull=False,
+                    reminder_sent_at__isnull=True,
+                    no_reminder=False,
+                ),
+            ),
+        ]
 
 
 class VisitNote(models.Model):
@@ -860,7 +895,7 @@ class VisitNote(models.Model):
         help_text=_("Whether this note is hidden from clients"),
     )
 
-    history = HistoricalRecords()
+    history = BatchedHistoricalRecords()
 
     def save(self, *args, **kwargs):
         sanitizer = Sanitizer({"keep_typographic_whitespace": True})
@@ -925,7 +960,7 @@ class VisitDocument(models.Model):
         help_text=_("Whether this document is hidden from clients"),
     )
 
-    history = HistoricalRecords()
+    history = BatchedHistoricalRecords()
 
     class Meta:
         verbose_name = _("Visit Document")
@@ -997,7 +1032,7 @@ class FreeFormTest(models.Model):
         help_text=_("Timestamp when the result was recorded"),
     )
 
-    history = HistoricalRecords()
+    history = BatchedHistoricalRecords()
 
 
 class TestResult(models.Model):
@@ -1031,6 +1066,22 @@ class ExportStatus(models.TextChoices):
     FAILED = "failed", _("Failed")
 
 
+class ExportMode(models.TextChoices):
+    """Which visits of the date range a visit export contains."""
+
+    FULL = "full", _("Full")
+    INCREMENTAL = "incremental", _("Incremental")
+
+
+class ExportFormat(models.TextChoices):
+    """File format of a visit export."""
+
+    XLSX = "xlsx", _("Excel (xlsx)")
+    PARQUET = "parquet", _("Parquet")
+    ARROW = "arrow", _("Arrow IPC")
+    CSV_GZIP = "csv.gz", _("CSV (gzip)")
+
+
 class VisitExport(models.Model):
     user = models.ForeignKey(
         "auth.User",
@@ -1049,6 +1100,53 @@ class VisitExport(models.Model):
     start_date = models.DateField(verbose_name=_("Start Date"))
     end_date = models.DateField(verbose_name=_("End Date"))
 
+    format = models.CharField(
+        max_length=10,
+        choices=ExportFormat.choices,
+        default=ExportFormat.XLSX,
+        verbose_name=_("Format"),
+        help_text=_(
+            "Excel files are limited to about one million rows, "
+            "use Parquet or Arrow for large exports"
+        ),
+    )
+
+    mode = models.CharField(
+        max_length=20,
+        choices=ExportMode.choices,
+        default=ExportMode.FULL,
+        verbose_name=_("Mode"),
+        help_text=_(
+            "Incremental exports only contain visits of the date range that "
+            "changed since the last incremental export"
+        ),
+    )
+
+    modified_since = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name=_("Modified Since"),
+        help_text=_(
+            "Lower bound (exclusive) of the last modification of exported visits"
+        ),
+    )
+
+    modified_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name=_("Modified Until"),
+        help_text=_(
+            "Upper bound (inclusive) of the last modification of exported visits"
+        ),
+    )
+
+    manifest = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name=_("Manifest"),
+        help_text=_("Description of the exported file and its watermarks"),
+    )
+
     file = models.FileField(
         upload_to="visit_exports/",
         null=True,
@@ -1076,6 +1174,66 @@ class VisitExport(models.Model):
         help_text=_("Progress of the export in percentage"),
     )
 
+    processed_visits = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_("Processed Visits"),
+        help_text=_("Number of visits processed so far"),
+    )
+
+    started_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name=_("Started At"),
+    )
+
+    progress_updated_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name=_("Progress Updated At"),
+    )
+
+    def rows_per_second(self):
+        if not self.started_at or not self.progress_updated_at:
+            return None
+        elapsed = (self.progress_updated_at - self.started_at).total_seconds()
+        if elapsed <= 0:
+            return None
+        return round(self.processed_visits / elapsed, 1)
+
+    rows_per_second.short_description = _("Visits per Second")  # type: ignore[unresolved-attribute]
+
+    def eta(self):
+        rate = self.rows_per_second()
+        if not rate or self.status != ExportStatus.IN_PROGRESS:
+            return None
+        remaining = (self.total_visits or 0) - self.processed_visits
+        return timedelta(seconds=round(max(0, remaining) / rate))
+
+    eta.short_description = _("Estimated Time Remaining")  # type: ignore[unresolved-attribute]
+
+    def previous_incremental(self) -> "VisitExport | None":
+        """The last completed incremental export of the same tenant.
+
+        The watermark does not depend on the date range, so exports with a
+        rolling range (e.g. a nightly pull up to today) continue each other.
+        Exports of superusers span all tenants, their watermark is kept per
+        user instead."""
+        exports = VisitExport.objects.filter(
+            mode=ExportMode.INCREMENTAL,
+            status=ExportStatus.COMPLETED,
+            modified_until__isnull=False,
+        ).exclude(pk=self.pk)
+
+        if self.user.is_superuser:
+            exports = exports.filter(user=self.user)
+        else:
+            exports = exports.filter(
+                user__is_superuser=False,
+                user__consultant__tenant=self.user.consultant.tenant,
+            )
+
+        return exports.order_by("-modified_until").first()
+
     def download_url(self):
         if self.file:
             link = reverse("sure:download_visit_export", args=[self.pk])
@@ -0,0 +1,83 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any
+
+from django.db.models import Q, QuerySet
+from django.http import HttpRequest
+from ninja import Field, Schema
+from ninja.pagination import PaginationBase
+
+
+class KeysetPagination(PaginationBase):
+    """Cursor pagination over a descending (timestamp, id) ordering.
+
+    Instead of an OFFSET, the next page starts after the last row of the
+    current one, so every page costs the same independent of its depth. The
+    exact total would need a full COUNT(*), only the planner's estimate is
+    returned and only if asked for."""
+
+    class Input(Schema):
+        cursor: str | None = None
+        page_size: int = Field(20, ge=1, le=100)
+        approximate_total: bool = False
+
+    class Output(Schema):
+        items: list[Any]
+        next_cursor: str | None = None
+        approximate_total: int | None = None
+
+    items_attribute: str = "items"
+
+    def __init__(self, field: str = "last_modified_at", **kwargs):
+        self.field = field
+        super().__init__(**kwargs)
+
+    def encode_cursor(self, item) -> str:
+        value = [getattr(item, self.field).isoformat(), item.pk]
+        return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+    def decode_cursor(self, cursor: str) -> tuple[datetime, int]:
+        try:
+            value, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return datetime.fromisoformat(value), int(pk)
+        except (ValueError, TypeError) as e:
+            raise ValueError("Invalid cursor") from e
+
+    def approximate_count(self, queryset: QuerySet) -> int:
+        """Row estimate of the query planner, without running the query."""
+        plan = json.loads(queryset.order_by().explain(format="json"))
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    def paginate_queryset(
+        self,
+        queryset: QuerySet,
+        pagination: Input,
+        request: HttpRequest,
+        **params: Any,
+    ) -> Any:
+        page = queryset.order_by(f"-{self.field}", "-pk")
+
+        if pagination.cursor:
+            value, pk = self.decode_cursor(pagination.cursor)
+            page = page.filter(
+                Q(**{f"{self.field}__lt": value})
+                | Q(**{self.field: value, "pk__lt": pk})
+            )
+
+        # One extra row tells whether there is a next page
+        items = list(page[: pagination.page_size + 1])
+        next_cursor = None
+        if len(items) > pagination.page_size:
+            items = items[: pagination.page_size]
+            next_cursor = self.encode_cursor(items[-1])
+
+        return {
+            "items": items,
+            "next_cursor": next_cursor,
+            "approximate_total": (
+                self.approximate_count(queryset)
+                if pagination.approximate_total
+                else None
+            ),
+        }
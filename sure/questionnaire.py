@@ -4,6 +4,7 @@ import logging
 
 import pandas as pd
 
+from core.history import batched_history
 from sure.models import ClientQuestion, QuestionFormats, Questionnaire, Section
 
 logger = logging.getLogger(__name__)
@@ -91,6 +92,7 @@ def create_question(row, order, section) -> ClientQuestion | None:
     return question
 
 
+@batched_history()
 def import_client_questions(df: pd.DataFrame, questionnaire: Questionnaire):
     """Import client questions from a pandas DataFrame."""
     df = df.fillna("")
@@ -135,6 +137,7 @@ SKIP_QUESTIONS = [
 ]
 
 
+@batched_history()
 def import_consultant_questions(df: pd.DataFrame, questionnaire: Questionnaire):
     """Import consultant questions from a pandas DataFrame."""
     df = df.fillna("")
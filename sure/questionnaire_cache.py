@@ -0,0 +1,48 @@
+"""Cached questionnaire payloads.
+
+The questionnaire a client or consultant sees only depends on the
+questionnaire, the location's excluded and included questions, the language
+and whether consultant questions are included. The rendered JSON is cached per
+combination under a version stamp, which every edit of a questionnaire or of
+a location's question selection bumps (see :mod:`sure.signals`)."""
+
+import json
+
+from django.core.cache import cache
+from django.utils.translation import get_language
+from ninja.responses import NinjaJSONEncoder
+
+from core.cache_version import bump_version, get_version
+from sure.cases import prefetch_questionnaire
+from sure.schema import InternalQuestionnaireSchema, QuestionnaireSchema
+from tenants.models import Location
+
+PAYLOAD_VERSION_KEY = "questionnaire_payload:version"
+TIMEOUT = 60 * 60 * 24
+
+
+def invalidate_questionnaire_payloads() -> None:
+    bump_version(PAYLOAD_VERSION_KEY)
+
+
+def render_questionnaire(
+    questionnaire_id: int, location: Location, internal: bool = False
+) -> bytes:
+    """The questionnaire as JSON, as the case endpoints return it."""
+    key = (
+        f"questionnaire_payload:{get_version(PAYLOAD_VERSION_KEY)}:"
+        f"{questionnaire_id}:{location.pk}:{get_language()}:{int(internal)}"
+    )
+
+    payload = cache.get(key)
+    if payload is None:
+        schema = InternalQuestionnaireSchema if internal else QuestionnaireSchema
+        questionnaire = prefetch_questionnaire(location, internal=internal).get(
+            pk=questionnaire_id
+        )
+        payload = json.dumps(
+            schema.model_validate(questionnaire).model_dump(), cls=NinjaJSONEncoder
+        ).encode()
+        cache.set(key, payload, timeout=TIMEOUT)
+
+    return payload
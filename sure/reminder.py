@@ -1,16 +1,21 @@
 import logging
-from datetime import datetime, timedelta
+from datetime import UTC, datetime, time, timedelta
+from itertools import batched
 
+from django.db.models import Exists, OuterRef
 from django.utils import timezone
-from django.utils.translation import activate
+from simple_history.utils import bulk_update_with_history
 
-from sms.service import send_sms
+from sms.models import SMSStatus
+from sms.service import send_bulk_sms
 from sure.models import Visit
 from texts.translate import translate
 
 logger = logging.getLogger(__name__)
 
 REMINDER_QUESTION_LABEL = "REMINDER"
+# Reminders sent before their visits are saved, a failure only loses one batch
+REMINDER_BATCH_SIZE = 100
 
 
 def parse_duration_string(duration_str: str) -> timedelta:
@@ -64,16 +69,16 @@ def get_reminder_date(visit: Visit) -> datetime | None:
     return reminder_answer.created_at + duration
 
 
-def send_reminder(visit: Visit):
-    activate(visit.case.language)
-    base_text = translate("reminder-notification")
+def reminder_message(visit: Visit):
+    """The (phone number, text, tenant) of the visit's reminder."""
+    base_text = translate("reminder-notification", language=visit.case.language)
     location_text = visit.case.location.reminder_text
 
     phone_number = visit.case.connection.client.contact.phone_number
 
     message = f"{base_text}\n{location_text}" if location_text else base_text
 
-    send_sms(phone_number, message, visit.case.location.tenant)
+    return phone_number, message, visit.case.location.tenant
 
 
 def find_visits_for_reminders():
@@ -86,32 +91,60 @@ def find_visits_for_reminders():
     )
 
 
+def reminder_cutoff() -> datetime:
+    """Reminders are due on their day, the cutoff is the start of tomorrow."""
+    tomorrow = timezone.now().date() + timedelta(days=1)
+    return datetime.combine(tomorrow, time.min, tzinfo=UTC)
+
+
+def due_reminders():
+    """The visits with a due reminder, a range scan of the next_reminder_at
+    index, annotated with whether the client has a newer visit."""
+    newer_visits = Visit.objects.filter(
+        case__connection__client=OuterRef("case__connection__client"),
+        created_at__gt=OuterRef("created_at"),
+    )
+
+    return (
+        find_visits_for_reminders()
+        .filter(next_reminder_at__lt=reminder_cutoff())
+        .select_related("case__location__tenant", "case__connection__client__contact")
+        .annotate(has_newer_visit=Exists(newer_visits))
+    )
+
+
+def plan_reminders() -> tuple[list[Visit], list[Visit], int]:
+    """Split the visits with a due reminder into the ones to send and the ones
+    with a newer visit of the client, which never get a reminder."""
+    due, skipped = [], []
+    for visit in due_reminders():
+        (skipped if visit.has_newer_visit else due).append(visit)
+
+    return due, skipped, len(due) + len(skipped)
+
+
 def send_reminders():
-    visits = find_visits_for_reminders()
-    total = len(visits)
-    sent = 0
+    due, skipped, total = plan_reminders()
 
-    for visit in visits:
-        client = visit.case.connection.client
-        newer_visits = Visit.objects.filter(
-            case__connection__client=client,
-            created_at__gt=visit.created_at,
-        )
+    for visit in skipped:
+        visit.no_reminder = True
+    bulk_update_with_history(skipped, Visit, ["no_reminder"], batch_size=500)
+
+    # Batches of a single tenant where possible, each is saved once sent.
+    due.sort(key=lambda visit: visit.case.location.tenant_id)
+    sent = 0
+    for batch in batched(due, REMINDER_BATCH_SIZE):
+        messages = send_bulk_sms(reminder_message(visit) for visit in batch)
+        delivered = [
+            visit
+            for visit, message in zip(batch, messages)
+            if message.status == SMSStatus.SENT
+        ]
+
+        now = timezone.now()
+        for visit in delivered:
+            visit.reminder_sent_at = now
+        bulk_update_with_history(delivered, Visit, ["reminder_sent_at"])
+        sent += len(delivered)
 
-        if newer_visits.exists():
-            # There is a newer visit for this client, skip sending reminder
-            visit.no_reminder = True
-            visit.save()
-            continue
-
-        reminder_date = get_reminder_date(visit)
-        if reminder_date is None:
-            visit.no_reminder = True
-            visit.save()
-            continue
-        if reminder_date.date() <= timezone.now().date():
-            send_reminder(visit)
-            visit.reminder_sent_at = timezone.now()
-            visit.save()
-            sent += 1
     return sent, total
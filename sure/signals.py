@@ -0,0 +1,76 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from sure.cases import touch_visits
+from sure.export_layout import invalidate_layouts
+from sure.models import (
+    ClientAnswer,
+    ClientOption,
+    ClientQuestion,
+    ConsultantAnswer,
+    ConsultantOption,
+    ConsultantQuestion,
+    Questionnaire,
+    Section,
+    Test,
+    TestResult,
+)
+from sure.questionnaire_cache import invalidate_questionnaire_payloads
+from tenants.models import Location
+
+LAYOUT_MODELS = (
+    Questionnaire,
+    Section,
+    ClientQuestion,
+    ConsultantQuestion,
+    ClientOption,
+)
+
+
+def invalidate_export_layouts(sender, **kwargs):
+    invalidate_layouts()
+
+
+for model in LAYOUT_MODELS:
+    post_save.connect(invalidate_export_layouts, sender=model)
+    post_delete.connect(invalidate_export_layouts, sender=model)
+
+
+QUESTIONNAIRE_MODELS = LAYOUT_MODELS + (ConsultantOption,)
+
+
+def invalidate_payloads(sender, **kwargs):
+    invalidate_questionnaire_payloads()
+
+
+for model in QUESTIONNAIRE_MODELS:
+    post_save.connect(invalidate_payloads, sender=model)
+    post_delete.connect(invalidate_payloads, sender=model)
+
+
+@receiver(m2m_changed, sender=ClientQuestion.show_for_options.through)
+def invalidate_show_for_options(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        invalidate_layouts()
+        invalidate_questionnaire_payloads()
+
+
+@receiver(m2m_changed, sender=Location.excluded_questions.through)
+@receiver(m2m_changed, sender=Location.included_questions.through)
+def invalidate_location_questions(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        invalidate_questionnaire_payloads()
+
+
+@receiver(post_save, sender=ClientAnswer)
+@receiver(post_save, sender=ConsultantAnswer)
+@receiver(post_save, sender=Test)
+def touch_visit(sender, instance, created, **kwargs):
+    if created:
+        touch_visits([instance.visit_id], instance.created_at)
+
+
+@receiver(post_save, sender=TestResult)
+def touch_visit_of_test(sender, instance, created, **kwargs):
+    if created:
+        touch_visits([instance.test.visit_id], instance.created_at)
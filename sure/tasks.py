@@ -1,19 +1,45 @@
-import io
+import os
+import shutil
 from datetime import timedelta
+from tempfile import SpooledTemporaryFile, TemporaryDirectory
+from typing import cast
 
 import polars as pl
-from celery import shared_task
+from celery import chord, shared_task
 from django.conf import settings
-from django.core.files.base import ContentFile
+from django.core.files import File
+from django.core.files.storage import default_storage
 from django.core.mail import send_mail
+from django.db.models import F
 from django.utils import timezone
 
-from sure.cases import get_export_dict
+from core.progress import ProgressReporter
+from sure.cases import transition_visits
 from sure.export import generate_pdfs
 from sure.models import Questionnaire
 from sure.reminder import send_reminders
+from sure.visit_export import (
+    XLSX_MAX_ROWS,
+    build_export_frame,
+    export_queryset,
+    iter_export_frames,
+    load_layouts,
+    questionnaire_ids,
+    shard_ranges,
+    write_export,
+    write_parts,
+)
 
-from .models import ExportStatus, Visit, VisitExport, VisitStatus
+from .models import (
+    ExportFormat,
+    ExportMode,
+    ExportStatus,
+    Visit,
+    VisitExport,
+    VisitStatus,
+)
+
+EXPORT_SPOOL_SIZE = 32 * 1024 * 1024
 
 
 @shared_task
@@ -24,68 +50,207 @@ def example_task(x, y):
 @shared_task
 def reset_unseen_task():
     timestamp = timezone.now() - timedelta(days=7)
-    counter = 0
-    for visit in Visit.objects.filter(
-        status=VisitStatus.RESULTS_SENT, published_at__lt=timestamp
-    ):
-        visit.status = VisitStatus.RESULTS_MISSED
-        visit.published_at = None
-        visit.save(update_fields=["status", "published_at"])
-        counter += 1
+    visits = transition_visits(
+        Visit.objects.filter(
+            status=VisitStatus.RESULTS_SENT, published_at__lt=timestamp
+        ),
+        VisitStatus.RESULTS_MISSED,
+        reason="Results not seen within 7 days",
+    )
 
-    return f"Reset {counter} visits from RESULTS_SENT to RESULTS_MISSED."
+    return f"Reset {len(visits)} visits from RESULTS_SENT to RESULTS_MISSED."
 
 
 @shared_task
 def close_seen_task():
     timestamp = timezone.now() - timedelta(days=7)
-    counter = 0
-    for visit in Visit.objects.filter(
-        status=VisitStatus.RESULTS_SEEN, published_at__lt=timestamp
-    ):
-        visit.status = VisitStatus.CLOSED
-        visit.save(update_fields=["status"])
-        counter += 1
+    visits = transition_visits(
+        Visit.objects.filter(
+            status=VisitStatus.RESULTS_SEEN, published_at__lt=timestamp
+        ),
+        VisitStatus.CLOSED,
+        reason="Results seen more than 7 days ago",
+    )
 
-    return f"Closed {counter} visits from RESULTS_SEEN to CLOSED."
+    return f"Closed {len(visits)} visits from RESULTS_SEEN to CLOSED."
 
 
 @shared_task
 def create_export(export_id: int) -> None:
+    """Split the export into shards of visits and merge them once all are done."""
     export = VisitExport.objects.get(id=export_id)
 
-    queryset = Visit.objects.filter(
-        created_at__date__gte=export.start_date,
-        created_at__date__lte=export.end_date,
-    )
+    previous = None
+    if export.mode == ExportMode.INCREMENTAL:
+        previous = export.previous_incremental()
+        export.modified_since = previous.modified_until if previous else None
+        export.modified_until = timezone.now()
+        export.save(update_fields=["modified_since", "modified_until"])
+
+    queryset = export_queryset(export)
+    export.total_visits = queryset.count()
 
-    if not export.user.is_superuser:
-        tenant = export.user.consultant.tenant
-        queryset = queryset.filter(case__location__tenant=tenant)
+    if export.format == ExportFormat.XLSX and export.total_visits > XLSX_MAX_ROWS:
+        export.status = ExportStatus.FAILED
+        export.error_message = (
+            f"{export.total_visits} visits exceed the Excel row limit of "
+            f"{XLSX_MAX_ROWS}, use Parquet, Arrow or CSV instead."
+        )
+        export.save(update_fields=["status", "total_visits", "error_message"])
+        return
 
     export.status = ExportStatus.IN_PROGRESS
-    export.total_visits = queryset.count()
-    export.save(update_fields=["status", "total_visits"])
+    export.progress = 0
+    export.processed_visits = 0
+    export.started_at = timezone.now()
+    export.manifest = {"previous_export": previous.pk if previous else None}
+    export.save(
+        update_fields=[
+            "status",
+            "total_visits",
+            "progress",
+            "processed_visits",
+            "started_at",
+            "manifest",
+        ]
+    )
+
+    questionnaires = questionnaire_ids(queryset)
+    shards = [
+        create_export_shard.s(export.pk, index, first_pk, last_pk, questionnaires)
+        for index, (first_pk, last_pk) in enumerate(
+            shard_ranges(queryset, settings.VISIT_EXPORT_SHARD_SIZE)
+        )
+    ]
+    chord(shards)(
+        merge_export.s(export.pk, questionnaires).on_error(fail_export.s(export.pk))
+    )
+
+
+def shards_directory(export_id: int) -> str:
+    return f"visit_exports/parts/{export_id}"
+
+
+def delete_shards(export_id: int) -> None:
+    directory = shards_directory(export_id)
+    try:
+        _, names = default_storage.listdir(directory)
+    except FileNotFoundError:
+        return
+    for name in names:
+        default_storage.delete(f"{directory}/{name}")
+
+
+@shared_task
+def create_export_shard(
+    export_id: int,
+    index: int,
+    first_pk: int,
+    last_pk: int,
+    questionnaires: list[int],
+) -> str:
+    """Export the visits with first_pk <= pk <= last_pk into a parquet file in
+    the default storage and return its name."""
+    export = VisitExport.objects.get(id=export_id)
+    queryset = export_queryset(export).filter(pk__gte=first_pk, pk__lte=last_pk)
+    reported = 0
 
-    records = []
+    def report(reporter: ProgressReporter):
+        nonlocal reported
+        delta = reporter.processed - reported
+        reported = reporter.processed
+        # Shards run concurrently, so the counters are incremented in the
+        # database instead of being overwritten.
+        VisitExport.objects.filter(pk=export_id).update(
+            processed_visits=F("processed_visits") + delta,
+            progress=(F("processed_visits") + delta) * 100 / F("total_visits"),
+            progress_updated_at=timezone.now(),
+        )
+
+    reporter = ProgressReporter(export.total_visits or 0, report)
+    layouts = load_layouts(questionnaires)
+
+    with TemporaryDirectory() as directory:
+        parts = []
+        for path, count in write_parts(
+            iter_export_frames(queryset, layouts), directory
+        ):
+            parts.append(path)
+            reporter.advance(count)
+        report(reporter)
+
+        path = os.path.join(directory, "shard.parquet")
+        write_export(parts, ExportFormat.PARQUET, path)
+        with open(path, "rb") as file:
+            return default_storage.save(
+                f"{shards_directory(export_id)}/shard-{index:05}.parquet",
+                File(file),
+            )
+
+
+@shared_task
+def merge_export(shards: list[str], export_id: int, questionnaires: list[int]):
+    """Assemble the shard files into the export file."""
+    export = VisitExport.objects.get(id=export_id)
+    filename = f"visit_export_{export.start_date}_{export.end_date}.{export.format}"
+
+    with TemporaryDirectory() as directory:
+        parts = []
+        for index, name in enumerate(shards):
+            path = os.path.join(directory, f"shard-{index:05}.parquet")
+            with default_storage.open(name, "rb") as source, open(path, "wb") as target:
+                shutil.copyfileobj(source, target)
+            parts.append(path)
+
+        if not parts:
+            empty = build_export_frame(
+                Visit.objects.none(), load_layouts(questionnaires)
+            )
+            parts = [path for path, _ in write_parts([empty], directory)]
 
-    for visit in queryset:
-        records.append(get_export_dict(visit))
-        export.progress = int(len(records) / export.total_visits * 100)
-        export.save(update_fields=["progress"])
+        with SpooledTemporaryFile(max_size=EXPORT_SPOOL_SIZE) as output:
+            write_export(parts, export.format, output)
+            output.seek(0)
+            export.file.save(filename, File(output), save=False)
 
-    df = pl.DataFrame(records, infer_schema_length=None)
-    # Store the dataframe as excel in export.file
+        count = pl.scan_parquet(parts).select(pl.len()).collect(engine="in-memory")
+        rows = cast(pl.DataFrame, count).item()
+        columns = list(pl.read_parquet_schema(parts[0]))
 
-    # Store the dataframe as excel in export.file
-    buffer = io.BytesIO()
-    df.write_excel(buffer)
-    buffer.seek(0)
+    for name in shards:
+        default_storage.delete(name)
 
-    filename = f"visit_export_{export.start_date}_{export.end_date}.xlsx"
-    export.file.save(filename, ContentFile(buffer.read()), save=True)
+    export.manifest = {
+        "mode": export.mode,
+        "format": export.format,
+        "file": export.file.name,
+        "start_date": export.start_date.isoformat(),
+        "end_date": export.end_date.isoformat(),
+        "modified_since": (
+            export.modified_since.isoformat() if export.modified_since else None
+        ),
+        "modified_until": (
+            export.modified_until.isoformat() if export.modified_until else None
+        ),
+        "previous_export": export.manifest.get("previous_export"),
+        "shards": len(shards),
+        "rows": rows,
+        "columns": columns,
+    }
     export.status = ExportStatus.COMPLETED
-    export.save(update_fields=["status"])
+    export.progress = 100
+    export.processed_visits = rows
+    export.progress_updated_at = timezone.now()
+    export.save(
+        update_fields=[
+            "file",
+            "manifest",
+            "status",
+            "progress",
+            "processed_visits",
+            "progress_updated_at",
+        ]
+    )
 
     if export.user.email:
         send_mail(
@@ -96,6 +261,17 @@ def create_export(export_id: int) -> None:
         )
 
 
+@shared_task
+def fail_export(request, exc, traceback, export_id: int) -> None:
+    """Error callback of the export chord, called when a shard or the merge
+    failed."""
+    # pylint: disable=unused-argument
+    VisitExport.objects.filter(pk=export_id).update(
+        status=ExportStatus.FAILED, error_message=str(exc)
+    )
+    delete_shards(export_id)
+
+
 @shared_task
 def send_reminder_task() -> str:
     sent, total = send_reminders()
@@ -103,7 +279,16 @@ def send_reminder_task() -> str:
     return f"Sent {sent} reminders out of {total} visits."
 
 
-@shared_task
-def generate_pdf_task(questionnaire_id: int) -> None:
+@shared_task(bind=True)
+def generate_pdf_task(self, questionnaire_id: int) -> None:
     questionnaire = Questionnaire.objects.get(id=questionnaire_id)
-    generate_pdfs(questionnaire)
+
+    def report(reporter: ProgressReporter):
+        self.update_state(
+            state="PROGRESS",
+            meta={"progress": reporter.percent, "processed": reporter.processed},
+        )
+
+    generate_pdfs(
+        questionnaire, ProgressReporter(len(settings.LANGUAGES), report, interval=1)
+    )
@@ -1,6 +1,12 @@
+from datetime import timedelta
+
 from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
 from django.test import TestCase
+from django.utils import timezone
 
+from core.history import batched_history
+from sure.cases import backfill_last_modified
 from sure.client_service import (
     canonicalize_phone_number,
     connect_case,
@@ -22,9 +28,11 @@ from sure.models import (
     Questionnaire,
     Section,
     Token,
+    Visit,
     VisitStatus,
 )
 from sure.schema import AnswerSchema, ChoiceSchema
+from sure.tasks import reset_unseen_task
 from tenants.models import Consultant, Tenant
 
 
@@ -162,7 +170,12 @@ class CaseManagementTest(TestCase):
         answer = AnswerSchema(questionId=client_question.pk, choices=[choice])
 
         # record answers (user None allowed for CREATED visits)
-        record_client_answers(visit, [answer], user=None)
+        changes = record_client_answers(visit, [answer], user=None)
+        self.assertEqual(
+            [(change.code, change.previous, change.choices) for change in changes],
+            [("Q1", None, [1])],
+        )
+        self.assertEqual(visit.logs.get().action, "Client answers recorded: Q1")
 
         visit.refresh_from_db()
         self.assertEqual(visit.status, VisitStatus.CLIENT_SUBMITTED)
@@ -173,6 +186,26 @@ class CaseManagementTest(TestCase):
         assert ca is not None
         self.assertEqual(ca.choices, [1])
         self.assertEqual(ca.texts, ["fine"])
+        self.assertGreaterEqual(visit.last_modified_at, ca.created_at)
+
+        # Unchanged answers are not recorded again
+        self.assertEqual(record_client_answers(visit, [answer], user=self.user), [])
+        self.assertEqual(visit.client_answers.count(), 1)
+        self.assertEqual(visit.logs.count(), 1)
+
+    def test_backfill_last_modified(self):
+        questionnaire = Questionnaire.objects.create(name="Test Questionnaire")
+        visits = [
+            create_visit(create_case(self.location.pk, self.user), questionnaire)
+            for _ in range(3)
+        ]
+        Visit.objects.update(last_modified_at=timezone.now() - timedelta(days=1))
+
+        self.assertEqual(backfill_last_modified(Visit.objects.all(), batch_size=2), 3)
+
+        for visit in visits:
+            visit.refresh_from_db()
+            self.assertEqual(visit.last_modified_at, visit.created_at)
 
     def test_get_cases(self):
         case1 = create_case(self.location.pk, self.user)
@@ -221,3 +254,59 @@ class CaseManagementTest(TestCase):
 
         self.assertTrue(location_can_view_case([new_location.pk], case1))
         self.assertTrue(location_can_view_case([self.location.pk], case2))
+
+    def test_transition_visits(self):
+        questionnaire = Questionnaire.objects.create(name="Test")
+        seen = create_visit(self.case, questionnaire)
+        seen.status = VisitStatus.RESULTS_SENT
+        seen.save()
+        Visit.objects.filter(pk=seen.pk).update(
+            published_at=timezone.now() - timedelta(days=8)
+        )
+
+        self.assertEqual(
+            reset_unseen_task(),
+            "Reset 1 visits from RESULTS_SENT to RESULTS_MISSED.",
+        )
+
+        seen.refresh_from_db()
+        self.assertEqual(seen.status, VisitStatus.RESULTS_MISSED)
+        self.assertIsNone(seen.published_at)
+        self.assertEqual(seen.history.latest().status, VisitStatus.RESULTS_MISSED)
+        self.assertEqual(seen.logs.get().action, "Status changed to results_missed")
+
+        self.assertEqual(
+            reset_unseen_task(),
+            "Reset 0 visits from RESULTS_SENT to RESULTS_MISSED.",
+        )
+
+    def test_batched_history(self):
+        questionnaire = Questionnaire.objects.create(name="Test")
+
+        with batched_history():
+            case = create_case(self.location.pk, self.user)
+            visit = create_visit(case, questionnaire)
+            visit.status = VisitStatus.CLIENT_SUBMITTED
+            visit.save()
+            self.assertFalse(visit.history.exists())
+
+        self.assertEqual(
+            list(visit.history.values_list("history_type", "status")),
+            [("~", VisitStatus.CLIENT_SUBMITTED), ("+", VisitStatus.CREATED)],
+        )
+        self.assertEqual(case.history.count(), 1)
+
+    def test_batched_history_savepoint_rollback(self):
+        questionnaire = Questionnaire.objects.create(name="Test")
+
+        with batched_history():
+            case = create_case(self.location.pk, self.user)
+            try:
+                with transaction.atomic():
+                    visit = create_visit(case, questionnaire)
+                    raise IntegrityError()
+            except IntegrityError:
+                pass
+
+        self.assertEqual(case.history.count(), 1)
+        self.assertFalse(Visit.history.filter(id=visit.pk).exists())
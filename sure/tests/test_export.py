@@ -0,0 +1,327 @@
+import gzip
+import os
+from datetime import timedelta
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+import polars as pl
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from core.celery import app
+from sure.cases import get_export_dict
+from sure.client_service import create_case, create_visit
+from sure.export_layout import get_layout
+from sure.models import (
+    ClientAnswer,
+    ClientQuestion,
+    ConsultantAnswer,
+    ConsultantQuestion,
+    ExportFormat,
+    ExportMode,
+    ExportStatus,
+    Questionnaire,
+    Section,
+    Test,
+    TestCategory,
+    TestKind,
+    Visit,
+    VisitExport,
+)
+from sure.tasks import create_export, create_export_shard, fail_export, merge_export
+from sure.visit_export import build_export_frame, write_export, write_parts
+from tenants.models import Consultant, Tenant
+
+
+class ExportTestCase(TestCase):
+    def setUp(self) -> None:
+        self.user = User.objects.create_user(username="owner", is_superuser=True)
+        self.tenant = Tenant.objects.create(name="Test Tenant", owner=self.user)
+        Consultant.objects.create(tenant=self.tenant, user=self.user)
+        self.location = self.tenant.locations.create(name="Test Location")
+
+        self.questionnaire = Questionnaire.objects.create(name="Export")
+        section = Section.objects.create(
+            questionnaire=self.questionnaire, order=0, title="S"
+        )
+        self.q1 = ClientQuestion.objects.create(
+            section=section, question_text="Smoker?", code="Q1", order=0
+        )
+        yes = self.q1.options.create(code="1", text="Yes", order=0)
+        self.q1.options.create(code="2", text="No", order=1)
+        self.q2 = ClientQuestion.objects.create(
+            section=section, question_text="How many?", code="Q2", order=1
+        )
+        self.q2.show_for_options.set([yes])
+        self.q3 = ClientQuestion.objects.create(
+            section=section, question_text="Comment", code="Q3", order=2
+        )
+        self.c1 = ConsultantQuestion.objects.create(
+            questionnaire=self.questionnaire, question_text="Risk", code="C1"
+        )
+
+        category = TestCategory.objects.create(number=1, name="STI")
+        self.hiv = TestKind.objects.create(category=category, number=1, name="HIV")
+        self.syph = TestKind.objects.create(
+            category=category,
+            number=2,
+            name="Syphilis",
+            interpretation_needed=True,
+            note="titer",
+        )
+        self.negative = self.hiv.result_options.create(label="negative")
+
+    def _visit(self, smoker: int) -> Visit:
+        visit = create_visit(
+            create_case(self.location.pk, self.user), self.questionnaire
+        )
+        ClientAnswer.objects.create(
+            visit=visit, question=self.q1, choices=[smoker], texts=["-"]
+        )
+        if smoker == 1:
+            ClientAnswer.objects.create(
+                visit=visit, question=self.q2, choices=[3, 4], texts=["a", "b"]
+            )
+        ConsultantAnswer.objects.create(
+            visit=visit, question=self.c1, choices=[], texts=[" "]
+        )
+        test = Test.objects.create(visit=visit, test_kind=self.hiv)
+        test.results.create(result_option=self.negative, note="ok")
+        Test.objects.create(visit=visit, test_kind=self.syph)
+        return visit
+
+    def _export(self, **kwargs) -> VisitExport:
+        today = timezone.localdate()
+        kwargs.setdefault("start_date", today)
+        kwargs.setdefault("end_date", today)
+        kwargs.setdefault("format", ExportFormat.PARQUET)
+        return VisitExport.objects.create(user=self.user, **kwargs)
+
+
+class VisitExportTest(ExportTestCase):
+    def test_matches_export_dict(self):
+        visits = [self._visit(1), self._visit(2)]
+
+        frame = build_export_frame(Visit.objects.all())
+        rows = {row["id"]: row for row in frame.iter_rows(named=True)}
+
+        for visit in visits:
+            record = get_export_dict(visit)
+            row = rows[visit.pk]
+            for column, value in record.items():
+                self.assertEqual(
+                    None if value is None else str(value),
+                    None if row[column] is None else str(row[column]),
+                    column,
+                )
+
+    def test_conditional_question_hidden(self):
+        visit = self._visit(2)
+
+        row = build_export_frame(Visit.objects.filter(pk=visit.pk)).row(0, named=True)
+
+        self.assertEqual(row["Q1_codes"], "2")
+        self.assertIsNone(row["Q2_codes"])
+        self.assertEqual(row["Q3_codes"], "99")
+        self.assertEqual(row["Q3_texts"], "missing")
+        self.assertEqual(row["C1_texts"], "missing")
+        self.assertEqual(row["HIV"], "negative")
+        self.assertEqual(row["Syphilis"], "no_result")
+        self.assertIsNone(row["Syphilis [titer]"])
+
+    def test_empty_export(self):
+        frame = build_export_frame(Visit.objects.none())
+
+        self.assertTrue(frame.is_empty())
+        self.assertIn("HIV", frame.columns)
+
+    def test_previous_incremental(self):
+        other = User.objects.create_user(username="other")
+        Consultant.objects.create(tenant=self.tenant, user=other)
+        today = timezone.now().date()
+
+        def export(user, **kwargs):
+            return VisitExport.objects.create(
+                user=user,
+                start_date=today,
+                end_date=today,
+                mode=ExportMode.INCREMENTAL,
+                **kwargs,
+            )
+
+        first = export(
+            other, status=ExportStatus.COMPLETED, modified_until=timezone.now()
+        )
+        export(self.user, status=ExportStatus.FAILED, modified_until=timezone.now())
+        current = export(other)
+
+        self.assertEqual(current.previous_incremental(), first)
+
+    def test_previous_incremental_rolling_range(self):
+        today = timezone.localdate()
+        previous = self._export(
+            mode=ExportMode.INCREMENTAL,
+            status=ExportStatus.COMPLETED,
+            start_date=today - timedelta(days=8),
+            end_date=today - timedelta(days=1),
+            modified_until=timezone.now(),
+        )
+        current = self._export(
+            mode=ExportMode.INCREMENTAL, start_date=today - timedelta(days=7)
+        )
+
+        self.assertEqual(current.previous_incremental(), previous)
+
+    def test_layout_invalidated_on_questionnaire_change(self):
+        layout = get_layout(self.questionnaire.pk)
+        self.assertEqual([q.code for q in layout.client_questions], ["Q1", "Q2", "Q3"])
+        self.assertEqual(layout.client_questions[1].show_for, [("Q1", "1")])
+
+        self.q2.show_for_options.clear()
+        ConsultantQuestion.objects.create(
+            questionnaire=self.questionnaire, question_text="Plan", code="C2", order=1
+        )
+
+        layout = get_layout(self.questionnaire.pk)
+        self.assertEqual(layout.client_questions[1].show_for, [])
+        self.assertEqual([q.code for q in layout.consultant_questions], ["C1", "C2"])
+
+
+@override_settings(
+    STORAGES={
+        "default": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+        "staticfiles": {
+            "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+        },
+    }
+)
+class ExportTaskTest(ExportTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        app.conf.task_always_eager = True
+        self.addCleanup(setattr, app.conf, "task_always_eager", False)
+
+    def test_create_export(self):
+        visits = [self._visit(1), self._visit(2)]
+        export = self._export()
+
+        create_export(export.pk)
+
+        export.refresh_from_db()
+        self.assertEqual(export.status, ExportStatus.COMPLETED)
+        self.assertEqual(export.processed_visits, 2)
+        self.assertEqual(export.manifest["rows"], 2)
+        with export.file.open("rb") as file:
+            frame = pl.read_parquet(file)
+        self.assertEqual(sorted(frame["id"]), sorted(visit.pk for visit in visits))
+
+    def test_create_empty_export(self):
+        export = self._export()
+
+        create_export(export.pk)
+
+        export.refresh_from_db()
+        self.assertEqual(export.status, ExportStatus.COMPLETED)
+        self.assertEqual(export.manifest["shards"], 0)
+        self.assertEqual(export.manifest["rows"], 0)
+        with export.file.open("rb") as file:
+            self.assertIn("HIV", pl.read_parquet(file).columns)
+
+    def test_shard_and_merge(self):
+        visit = self._visit(1)
+        export = self._export(total_visits=1)
+        questionnaires = [self.questionnaire.pk]
+
+        shard = create_export_shard(export.pk, 0, visit.pk, visit.pk, questionnaires)
+
+        self.assertTrue(default_storage.exists(shard))
+        export.refresh_from_db()
+        self.assertEqual(export.processed_visits, 1)
+
+        merge_export([shard], export.pk, questionnaires)
+
+        self.assertFalse(default_storage.exists(shard))
+        export.refresh_from_db()
+        self.assertEqual(export.status, ExportStatus.COMPLETED)
+        self.assertEqual(export.manifest["rows"], 1)
+
+    def test_xlsx_row_limit(self):
+        self._visit(1)
+        self._visit(2)
+        export = self._export(format=ExportFormat.XLSX)
+        with mock.patch("sure.tasks.XLSX_MAX_ROWS", 1):
+            create_export(export.pk)
+
+        export.refresh_from_db()
+        self.assertEqual(export.status, ExportStatus.FAILED)
+        self.assertIn("Excel row limit", export.error_message)
+        self.assertFalse(export.file)
+
+    def test_failing_shard(self):
+        export = self._export(status=ExportStatus.IN_PROGRESS)
+        shard = default_storage.save(
+            f"visit_exports/parts/{export.pk}/shard-00000.parquet",
+            ContentFile(b"parquet"),
+        )
+
+        fail_export(None, ValueError("Shard 1 failed"), None, export.pk)
+
+        export.refresh_from_db()
+        self.assertEqual(export.status, ExportStatus.FAILED)
+        self.assertEqual(export.error_message, "Shard 1 failed")
+        self.assertFalse(default_storage.exists(shard))
+
+
+class ExportFormatTest(SimpleTestCase):
+    frame = pl.DataFrame(
+        {
+            "id": [1, 2, 3],
+            "HIV": ["negative", None, "positive"],
+            "Q1_codes": ["1", "2", "99"],
+        }
+    )
+
+    def _round_trip(self, export_format: str, read) -> pl.DataFrame:
+        with TemporaryDirectory() as directory:
+            parts = [
+                path
+                for path, _ in write_parts(
+                    [self.frame.slice(0, 2), self.frame.slice(2)], directory
+                )
+            ]
+            path = os.path.join(directory, f"export.{export_format}")
+            with open(path, "wb") as output:
+                write_export(parts, export_format, output)
+            return read(path)
+
+    def test_parquet(self):
+        frame = self._round_trip(ExportFormat.PARQUET, pl.read_parquet)
+        self.assertTrue(frame.equals(self.frame))
+
+    def test_arrow(self):
+        frame = self._round_trip(ExportFormat.ARROW, pl.read_ipc)
+        self.assertTrue(frame.equals(self.frame))
+
+    def test_csv_gzip(self):
+        def read(path):
+            with open(path, "rb") as file:
+                return pl.read_csv(
+                    gzip.decompress(file.read()),
+                    schema_overrides={"Q1_codes": pl.String},
+                )
+
+        frame = self._round_trip(ExportFormat.CSV_GZIP, read)
+        self.assertTrue(frame.equals(self.frame))
+
+    def test_xlsx(self):
+        def read(path):
+            return pl.read_excel(
+                path, schema_overrides={"id": pl.Int64, "Q1_codes": pl.String}
+            )
+
+        frame = self._round_trip(ExportFormat.XLSX, read)
+        self.assertEqual(frame.columns, self.frame.columns)
+        self.assertEqual(frame.rows(), self.frame.rows())
@@ -0,0 +1,60 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.http import HttpRequest
+from django.test import TestCase
+from django.utils import timezone
+
+from sure.client_service import create_case, create_visit
+from sure.models import Questionnaire, Visit
+from sure.pagination import KeysetPagination
+from tenants.models import Consultant, Tenant
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self) -> None:
+        owner = User.objects.create_user(username="owner")
+        tenant = Tenant.objects.create(name="Test Tenant", owner=owner)
+        consultant = Consultant.objects.create(tenant=tenant, user=owner)
+        location = tenant.locations.create(name="Test Location")
+        consultant.locations.add(location)
+        questionnaire = Questionnaire.objects.create(name="Q")
+
+        now = timezone.now()
+        for index in range(5):
+            visit = create_visit(create_case(location.pk, owner), questionnaire)
+            # Two visits share each timestamp, the id breaks the tie
+            Visit.objects.filter(pk=visit.pk).update(
+                last_modified_at=now - timedelta(minutes=index // 2)
+            )
+
+    def test_pages_cover_all_visits_in_order(self):
+        pagination = KeysetPagination()
+        expected = list(
+            Visit.objects.order_by("-last_modified_at", "-pk").values_list(
+                "pk", flat=True
+            )
+        )
+
+        seen = []
+        cursor = None
+        while True:
+            page = pagination.paginate_queryset(
+                Visit.objects.all(),
+                KeysetPagination.Input(cursor=cursor, page_size=2),
+                HttpRequest(),
+            )
+            seen.extend(visit.pk for visit in page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(ValueError):
+            KeysetPagination().paginate_queryset(
+                Visit.objects.all(),
+                KeysetPagination.Input(cursor="invalid"),
+                HttpRequest(),
+            )
@@ -0,0 +1,135 @@
+from django.contrib.auth.models import User
+from django.http import HttpRequest
+from django.test import TestCase, override_settings
+from django_otp import DEVICE_ID_SESSION_KEY
+from django_otp.plugins.otp_static.models import StaticDevice
+
+from core.query_budget import (
+    QueryBudgetExceeded,
+    assert_query_budget,
+    query_budget,
+)
+from sure.client_service import create_case, create_visit
+from sure.models import Questionnaire, Test, TestCategory, TestKind
+from tenants.models import APIToken, Consultant, Tenant
+
+
+@query_budget(queries=1)
+def count_questionnaires(request):
+    return Questionnaire.objects.count()
+
+
+class QueryBudgetTest(TestCase):
+    def test_within_budget(self):
+        with assert_query_budget(count_questionnaires) as recorder:
+            count_questionnaires(HttpRequest())
+
+        self.assertEqual(recorder.queries, 1)
+
+    def test_budget_exceeded(self):
+        with (
+            self.assertRaises(QueryBudgetExceeded),
+            assert_query_budget(count_questionnaires),
+        ):
+            count_questionnaires(HttpRequest())
+            count_questionnaires(HttpRequest())
+
+    def test_list_questionnaires(self):
+        for index in range(5):
+            Questionnaire.objects.create(name=f"Questionnaire {index}")
+
+        with assert_query_budget("sure.api.list_questionnaires"):
+            response = self.client.get("/api/sure/questionnaires/", secure=True)
+
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_STRICT=True)
+class CaseQueryBudgetTest(TestCase):
+    """The case listings and the case view stay within their budget
+    independent of the number of visits and tests."""
+
+    def setUp(self) -> None:
+        self.user = User.objects.create_user(username="owner")
+        tenant = Tenant.objects.create(name="Test Tenant", owner=self.user)
+        consultant = Consultant.objects.create(tenant=tenant, user=self.user)
+        location = tenant.locations.create(name="Test Location")
+        consultant.locations.add(location)
+        token = APIToken.objects.create(tenant=tenant, owner=self.user)
+        self.token = f"{token.name}:{token.token}"
+
+        questionnaire = Questionnaire.objects.create(name="Q")
+        category = TestCategory.objects.create(number=1, name="STI")
+        kinds = [
+            TestKind.objects.create(category=category, number=number, name=name)
+            for number, name in enumerate(["HIV", "Syphilis", "Chlamydia"], 1)
+        ]
+
+        self.visits = []
+        for _ in range(10):
+            visit = create_visit(create_case(location.pk, self.user), questionnaire)
+            for kind in kinds:
+                Test.objects.create(visit=visit, test_kind=kind)
+            self.visits.append(visit)
+
+    def _filters(self) -> dict:
+        empty = {"value": None, "matchMode": "equals"}
+        no_constraints = {"operator": "and", "constraints": []}
+        return {
+            "search": empty,
+            "case": empty,
+            "external_id": empty,
+            "client_id": empty,
+            "tags": no_constraints,
+            "location": empty,
+            "status": empty,
+            "last_modified_at": no_constraints,
+            "created_at": no_constraints,
+        }
+
+    def _list(self, path: str):
+        return self.client.post(
+            path,
+            self._filters(),
+            content_type="application/json",
+            headers={"X-Tenant-Token": self.token},
+            secure=True,
+        )
+
+    def test_list_cases(self):
+        with assert_query_budget("sure.api.list_cases"):
+            response = self._list("/api/sure/cases/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["count"], 10)
+
+    def test_list_cases_cursor(self):
+        with assert_query_budget("sure.api.list_cases_cursor"):
+            response = self._list("/api/sure/cases/cursor/?page_size=5")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["items"]), 5)
+
+        with assert_query_budget("sure.api.list_cases_cursor"):
+            response = self._list(
+                f"/api/sure/cases/cursor/?page_size=5"
+                f"&cursor={response.json()['next_cursor']}"
+            )
+
+        self.assertEqual(len(response.json()["items"]), 5)
+
+    def test_get_visit(self):
+        device = StaticDevice.objects.create(user=self.user, name="Test")
+        self.client.force_login(self.user)
+        session = self.client.session
+        session[DEVICE_ID_SESSION_KEY] = device.persistent_id
+        session.save()
+        visit = self.visits[0]
+
+        with assert_query_budget("sure.api.get_visit"):
+            response = self.client.get(
+                f"/api/sure/case/{visit.case.pk}/visit/", secure=True
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["id"], visit.pk)
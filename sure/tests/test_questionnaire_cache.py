@@ -0,0 +1,67 @@
+import json
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from sure.models import ClientQuestion, ConsultantQuestion, Questionnaire, Section
+from sure.questionnaire_cache import render_questionnaire
+from tenants.models import Tenant
+
+
+class QuestionnaireCacheTest(TestCase):
+    def setUp(self) -> None:
+        user = User.objects.create_user(username="owner", is_superuser=True)
+        tenant = Tenant.objects.create(name="Test Tenant", owner=user)
+        self.location = tenant.locations.create(name="Test Location")
+
+        self.questionnaire = Questionnaire.objects.create(name="Cached")
+        self.section = Section.objects.create(
+            questionnaire=self.questionnaire, order=0, title="S"
+        )
+        self.q1 = ClientQuestion.objects.create(
+            section=self.section,
+            question_text="Smoker?",
+            code="Q1",
+            order=0,
+            optional_for_centers=True,
+        )
+        ConsultantQuestion.objects.create(
+            questionnaire=self.questionnaire, question_text="Risk", code="C1"
+        )
+
+    def codes(self, internal=False):
+        payload = json.loads(
+            render_questionnaire(self.questionnaire.pk, self.location, internal)
+        )
+        return [
+            question["code"]
+            for section in payload["sections"]
+            for question in section["client_questions"]
+        ]
+
+    def test_cached_payload_served_without_queries(self):
+        self.codes()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.codes(), ["Q1"])
+
+    def test_internal_payload_has_consultant_questions(self):
+        payload = json.loads(
+            render_questionnaire(self.questionnaire.pk, self.location, internal=True)
+        )
+        self.assertEqual([q["code"] for q in payload["consultant_questions"]], ["C1"])
+        self.assertNotIn(
+            "consultant_questions",
+            json.loads(render_questionnaire(self.questionnaire.pk, self.location)),
+        )
+
+    def test_invalidated_on_question_change(self):
+        self.assertEqual(self.codes(), ["Q1"])
+        ClientQuestion.objects.create(
+            section=self.section, question_text="Comment", code="Q2", order=1
+        )
+        self.assertEqual(self.codes(), ["Q1", "Q2"])
+
+    def test_invalidated_on_location_exclusion(self):
+        self.assertEqual(self.codes(), ["Q1"])
+        self.location.excluded_questions.add(self.q1)
+        self.assertEqual(self.codes(), [])
@@ -2,7 +2,7 @@ import pandas as pd
 from django.contrib.auth.models import User
 from django.test import TestCase
 
-from sure.api import prefetch_questionnaire
+from sure.cases import prefetch_questionnaire
 from sure.models import ClientQuestion, Questionnaire
 from sure.questionnaire import import_client_questions, import_consultant_questions
 from tenants.models import Location, Tenant
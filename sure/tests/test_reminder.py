@@ -0,0 +1,94 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from sure.client_service import create_case, create_visit, record_consultant_answers
+from sure.models import (
+    Client,
+    Connection,
+    ConsultantAnswer,
+    ConsultantQuestion,
+    Contact,
+    Questionnaire,
+)
+from sure.reminder import REMINDER_QUESTION_LABEL, get_reminder_date, plan_reminders
+from sure.schema import AnswerSchema, ChoiceSchema
+from tenants.models import Consultant, Tenant
+
+
+class ReminderTest(TestCase):
+    def setUp(self) -> None:
+        self.user = User.objects.create_user(username="owner", is_superuser=True)
+        tenant = Tenant.objects.create(name="Test Tenant", owner=self.user)
+        Consultant.objects.create(tenant=tenant, user=self.user)
+        self.location = tenant.locations.create(name="Test Location")
+
+        self.questionnaire = Questionnaire.objects.create(name="Reminder")
+        self.question = ConsultantQuestion.objects.create(
+            questionnaire=self.questionnaire,
+            question_text="Reminder",
+            code=REMINDER_QUESTION_LABEL,
+        )
+        self.question.options.create(code="1", text_en="3 days", order=0)
+        self.question.options.create(code="2", text_en="never", order=1)
+
+        contact = Contact.objects.create(phone_number="+41791234567")
+        self.client_ = Client.objects.create(contact=contact)
+
+    def visit(self, choices, days_ago=0):
+        case = create_case(self.location.pk, self.user)
+        Connection.objects.create(case=case, client=self.client_)
+        visit = create_visit(case, self.questionnaire)
+        if choices is not None:
+            answer = ConsultantAnswer.objects.create(
+                visit=visit, question=self.question, choices=choices
+            )
+            ConsultantAnswer.objects.filter(pk=answer.pk).update(
+                created_at=timezone.now() - datetime.timedelta(days=days_ago)
+            )
+            visit.next_reminder_at = get_reminder_date(visit)
+            visit.save()
+        return visit
+
+    def test_plan_reminders(self):
+        visit = self.visit([1], days_ago=5)
+
+        due, skipped, total = plan_reminders()
+        self.assertEqual([due_visit.pk for due_visit in due], [visit.pk])
+        self.assertEqual((skipped, total), ([], 1))
+
+    def test_not_due_yet(self):
+        self.visit([1], days_ago=1)
+        self.visit([2])
+
+        self.assertEqual(plan_reminders(), ([], [], 0))
+
+    def test_skipped_for_newer_visit(self):
+        older = self.visit([1], days_ago=5)
+        self.visit(None)
+
+        due, skipped, total = plan_reminders()
+        self.assertEqual((due, total), ([], 1))
+        self.assertEqual([visit.pk for visit in skipped], [older.pk])
+
+    def test_next_reminder_recorded(self):
+        visit = self.visit(None)
+
+        record_consultant_answers(
+            visit,
+            [
+                AnswerSchema(
+                    questionId=self.question.pk,
+                    choices=[ChoiceSchema(code="1", text="")],
+                )
+            ],
+            self.user,
+        )
+
+        visit.refresh_from_db()
+        answer = visit.consultant_answers.get()
+        self.assertEqual(
+            visit.next_reminder_at, answer.created_at + datetime.timedelta(days=3)
+        )
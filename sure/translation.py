@@ -1,6 +1,7 @@
 import simple_history
 from modeltranslation.translator import TranslationOptions, translator
 
+from core.history import BatchedHistoricalRecords
 from sure.models import (
     ClientOption,
     ClientQuestion,
@@ -21,7 +22,7 @@ class QuestionaireTranslationOptions(TranslationOptions):
 
 
 translator.register(Questionnaire, QuestionaireTranslationOptions)
-simple_history.register(Questionnaire)
+simple_history.register(Questionnaire, records_class=BatchedHistoricalRecords)
 
 
 class SectionTranslationOptions(TranslationOptions):
@@ -33,7 +34,7 @@ class SectionTranslationOptions(TranslationOptions):
 
 
 translator.register(Section, SectionTranslationOptions)
-simple_history.register(Section)
+simple_history.register(Section, records_class=BatchedHistoricalRecords)
 
 
 class QuestionTranslationOptions(TranslationOptions):
@@ -42,8 +43,8 @@ class QuestionTranslationOptions(TranslationOptions):
 
 translator.register(ClientQuestion, QuestionTranslationOptions)
 translator.register(ConsultantQuestion, QuestionTranslationOptions)
-simple_history.register(ClientQuestion)
-simple_history.register(ConsultantQuestion)
+simple_history.register(ClientQuestion, records_class=BatchedHistoricalRecords)
+simple_history.register(ConsultantQuestion, records_class=BatchedHistoricalRecords)
 
 
 class OptionTranslationOptions(TranslationOptions):
@@ -63,8 +64,8 @@ class ClientOptionTranslationOptions(TranslationOptions):
 
 translator.register(ClientOption, ClientOptionTranslationOptions)
 translator.register(ConsultantOption, OptionTranslationOptions)
-simple_history.register(ClientOption)
-simple_history.register(ConsultantOption)
+simple_history.register(ClientOption, records_class=BatchedHistoricalRecords)
+simple_history.register(ConsultantOption, records_class=BatchedHistoricalRecords)
 
 
 class TestKindTranslationOptions(TranslationOptions):
@@ -72,7 +73,7 @@ class TestKindTranslationOptions(TranslationOptions):
 
 
 translator.register(TestKind, TestKindTranslationOptions)
-simple_history.register(TestKind)
+simple_history.register(TestKind, records_class=BatchedHistoricalRecords)
 
 
 class TestCategoryTranslationOptions(TranslationOptions):
@@ -94,7 +95,7 @@ class TestResultOptionTranslationOptions(TranslationOptions):
 
 
 translator.register(TestResultOption, TestResultOptionTranslationOptions)
-simple_history.register(TestResultOption)
+simple_history.register(TestResultOption, records_class=BatchedHistoricalRecords)
 
 
 class TestResultInformationTranslationOptions(TranslationOptions):
@@ -102,4 +103,4 @@ class TestResultInformationTranslationOptions(TranslationOptions):
 
 
 translator.register(ResultInformation, TestResultInformationTranslationOptions)
-simple_history.register(ResultInformation)
+simple_history.register(ResultInformation, records_class=BatchedHistoricalRecords)
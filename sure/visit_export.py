@@ -0,0 +1,482 @@
+"""Set-based export of visits into a wide polars frame.
+
+Instead of calling :func:`sure.cases.get_export_dict` (and its per question
+queries) once per visit, the latest answers, tests and results of all exported
+visits are loaded with a few window-function queries and pivoted into one
+column per question and test kind. The resulting columns are the same as the
+ones produced by ``get_export_dict``."""
+
+import gzip
+import os
+from itertools import batched
+from typing import IO, cast
+
+import polars as pl
+import xlsxwriter
+from django.db.models import F, QuerySet, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from sure.export_layout import QuestionnaireLayout, load_layouts
+from sure.models import (
+    ClientAnswer,
+    ConsultantAnswer,
+    ExportFormat,
+    ExportMode,
+    Test,
+    TestKind,
+    TestResult,
+    TestResultOption,
+    Visit,
+    VisitExport,
+)
+
+MISSING_CODE = 99
+MISSING_TEXT = "missing"
+NO_RESULT = "no_result"
+
+# Excel worksheets hold 1,048,576 rows, one of which is the header
+XLSX_MAX_ROWS = 1_048_575
+
+CHUNK_SIZE = 2000
+
+BASE_COLUMNS = [
+    "id",
+    "created_at",
+    "internal_id",
+    "status",
+    "tags",
+    "location",
+    "tenant",
+    "questionnaire",
+    "client_id",
+]
+
+VISIT_SCHEMA = {
+    "id": pl.Int64,
+    "created_at": pl.Datetime("us", "UTC"),
+    "internal_id": pl.String,
+    "status": pl.String,
+    "tags": pl.List(pl.String),
+    "location": pl.String,
+    "tenant": pl.String,
+    "questionnaire_id": pl.Int64,
+    "client_id": pl.String,
+}
+
+ANSWER_SCHEMA = {
+    "visit_id": pl.Int64,
+    "question_id": pl.Int64,
+    "choices": pl.List(pl.Int64),
+    "texts": pl.List(pl.String),
+}
+
+TEST_SCHEMA = {
+    "id": pl.Int64,
+    "visit_id": pl.Int64,
+    "test_kind_id": pl.Int64,
+}
+
+RESULT_SCHEMA = {
+    "test_id": pl.Int64,
+    "result_option_id": pl.Int64,
+    "note": pl.String,
+}
+
+
+def latest_per(queryset: QuerySet, *partition_by: str) -> QuerySet:
+    """Filter the queryset to the newest row (by created_at) per partition."""
+    return queryset.annotate(
+        row_number=Window(
+            RowNumber(),
+            partition_by=[F(name) for name in partition_by],
+            order_by=[F("created_at").desc(), F("pk").desc()],
+        )
+    ).filter(row_number=1)
+
+
+def _frame(rows, schema) -> pl.DataFrame:
+    return pl.DataFrame(list(rows), schema=schema, orient="row")
+
+
+def load_visits(queryset: QuerySet[Visit]) -> pl.DataFrame:
+    rows = queryset.order_by("pk").values_list(
+        "pk",
+        "created_at",
+        "case__external_id",
+        "status",
+        "tags",
+        "case__location__name",
+        "case__location__tenant__name",
+        "questionnaire_id",
+        "case__connection__client_id",
+    )
+    return _frame(rows, VISIT_SCHEMA)
+
+
+def load_answers(model, visit_ids: QuerySet) -> pl.DataFrame:
+    rows = latest_per(
+        model.objects.filter(visit_id__in=visit_ids), "visit_id", "question_id"
+    ).values_list("visit_id", "question_id", "choices", "texts")
+    return _frame(rows, ANSWER_SCHEMA)
+
+
+def load_tests(visit_ids: QuerySet) -> pl.DataFrame:
+    tests = _frame(
+        Test.objects.filter(visit_id__in=visit_ids).values_list(
+            "pk", "visit_id", "test_kind_id"
+        ),
+        TEST_SCHEMA,
+    )
+    results = _frame(
+        latest_per(
+            TestResult.objects.filter(test__visit_id__in=visit_ids), "test_id"
+        ).values_list("test_id", "result_option_id", "note"),
+        RESULT_SCHEMA,
+    )
+    return tests.join(results, left_on="id", right_on="test_id", how="left")
+
+
+def codes_expr(choices: pl.Expr) -> pl.Expr:
+    """Columnar version of :func:`sure.cases.get_answer_codes`."""
+    return (
+        pl.when(choices.list.len() == 0)
+        .then(pl.lit(str(MISSING_CODE)))
+        .otherwise(choices.list.eval(pl.element().cast(pl.String)).list.join(";"))
+    )
+
+
+def texts_expr(texts: pl.Expr) -> pl.Expr:
+    """Columnar version of :func:`sure.cases.get_answer_texts`."""
+    blank = texts.list.eval(pl.element().str.strip_chars() == "").list.all()
+    return (
+        pl.when((texts.list.len() == 0) | blank)
+        .then(pl.lit(MISSING_TEXT))
+        .otherwise(texts.list.join(";"))
+    )
+
+
+def _pivot(frame: pl.DataFrame, key: str, name: str, value: str) -> pl.DataFrame:
+    """Pivot a long (visit_id, key, value) frame into one column per key."""
+    if frame.is_empty():
+        return frame.select("visit_id")
+    return frame.select(
+        "visit_id",
+        pl.format(name, key).alias("column"),
+        pl.col(value),
+    ).pivot(on="column", index="visit_id", values=value)
+
+
+def _wide(frames: list[pl.DataFrame], visits: pl.DataFrame) -> pl.DataFrame:
+    for frame in frames:
+        visits = visits.join(frame, left_on="id", right_on="visit_id", how="left")
+    return visits
+
+
+def _column(frame: pl.DataFrame, name: str, dtype) -> pl.Expr:
+    if name in frame.columns:
+        return pl.col(name)
+    return pl.lit(None, dtype=dtype)
+
+
+def _contains(frame: pl.DataFrame, question_id: int, option_code: str) -> pl.Expr:
+    """Whether the latest answer to the question includes the option.
+
+    Unanswered questions count as answered with the missing code."""
+    try:
+        code = int(option_code)
+    except ValueError:
+        return pl.lit(False)
+    choices = _column(frame, f"{question_id}:choices", pl.List(pl.Int64))
+    return (
+        pl.when(choices.is_null())
+        .then(pl.lit(code == MISSING_CODE))
+        .otherwise(choices.list.contains(code))
+    )
+
+
+def _client_columns(
+    frame: pl.DataFrame, layout: QuestionnaireLayout
+) -> dict[str, tuple[pl.Expr, pl.Expr, pl.Expr]]:
+    """Build the code and text column expressions of the client questions.
+
+    Follows the logic of :func:`sure.cases.show_question`: a conditional
+    question is exported if a previously shown question was answered with one
+    of the options it depends on."""
+    shown: dict[str, tuple[int, pl.Expr]] = {}
+    columns = {}
+
+    for question in layout.client_questions:
+        if not question.show_for:
+            condition = pl.lit(True)
+        else:
+            conditions = [
+                shown[parent][1] & _contains(frame, shown[parent][0], option_code)
+                for parent, option_code in question.show_for
+                if parent in shown
+            ]
+            if not conditions:
+                continue
+            condition = pl.any_horizontal(conditions)
+
+        shown[question.code] = (question.id, condition)
+        columns[question.code] = (
+            condition,
+            _column(frame, f"{question.id}:codes", pl.String).fill_null(
+                str(MISSING_CODE)
+            ),
+            _column(frame, f"{question.id}:texts", pl.String).fill_null(MISSING_TEXT),
+        )
+
+    return columns
+
+
+def _consultant_columns(frame: pl.DataFrame, layout: QuestionnaireLayout):
+    return {
+        question.code: (
+            pl.lit(True),
+            _column(frame, f"c{question.id}:codes", pl.String).fill_null(
+                str(MISSING_CODE)
+            ),
+            _column(frame, f"c{question.id}:texts", pl.String).fill_null(MISSING_TEXT),
+        )
+        for question in layout.consultant_questions
+    }
+
+
+def _answer_columns(
+    frame: pl.DataFrame, layouts: dict[int, QuestionnaireLayout], builder
+) -> list[pl.Expr]:
+    """Merge the per questionnaire columns into one column per question code."""
+    branches: dict[str, list[tuple[pl.Expr, pl.Expr, pl.Expr]]] = {}
+
+    for layout in layouts.values():
+        in_questionnaire = pl.col("questionnaire_id") == layout.id
+        for code, (condition, codes, texts) in builder(frame, layout).items():
+            branches.setdefault(code, []).append(
+                (in_questionnaire & condition, codes, texts)
+            )
+
+    expressions = []
+    for code, options in branches.items():
+        for suffix, index in (("codes", 1), ("texts", 2)):
+            expression = pl.when(options[0][0]).then(options[0][index])
+            for option in options[1:]:
+                expression = expression.when(option[0]).then(option[index])
+            expressions.append(
+                expression.otherwise(pl.lit(None, dtype=pl.String)).alias(
+                    f"{code}_{suffix}"
+                )
+            )
+    return expressions
+
+
+def _test_columns(frame: pl.DataFrame) -> list[pl.Expr]:
+    expressions = []
+    for test_kind in TestKind.objects.all():
+        result = _column(frame, f"t{test_kind.pk}:result", pl.String)
+        expressions.append(result.alias(test_kind.name))
+        if test_kind.interpretation_needed:
+            expressions.append(
+                _column(frame, f"t{test_kind.pk}:note", pl.String).alias(
+                    f"{test_kind.name} [{test_kind.note}]"
+                )
+            )
+    return expressions
+
+
+def build_export_frame(
+    queryset: QuerySet[Visit],
+    layouts: dict[int, QuestionnaireLayout] | None = None,
+) -> pl.DataFrame:
+    """Build the wide export frame for all visits of the queryset.
+
+    Frames built with the same layouts share their columns and can be
+    concatenated."""
+    visit_ids = queryset.values("pk")
+
+    visits = load_visits(queryset)
+    if layouts is None:
+        layouts = load_layouts(visits["questionnaire_id"].unique().to_list())
+
+    client_answers = load_answers(ClientAnswer, visit_ids).with_columns(
+        codes=codes_expr(pl.col("choices")),
+        texts=pl.col("texts").list.join(";"),
+    )
+    consultant_answers = load_answers(ConsultantAnswer, visit_ids).with_columns(
+        codes=codes_expr(pl.col("choices")),
+        texts=texts_expr(pl.col("texts")),
+    )
+
+    labels = {option.pk: option.label for option in TestResultOption.objects.all()}
+    tests = load_tests(visit_ids).with_columns(
+        result=pl.col("result_option_id")
+        .replace_strict(labels, default=None, return_dtype=pl.String)
+        .fill_null(pl.lit(NO_RESULT)),
+    )
+
+    frame = _wide(
+        [
+            _pivot(client_answers, "question_id", "{}:codes", "codes"),
+            _pivot(client_answers, "question_id", "{}:texts", "texts"),
+            _pivot(client_answers, "question_id", "{}:choices", "choices"),
+            _pivot(consultant_answers, "question_id", "c{}:codes", "codes"),
+            _pivot(consultant_answers, "question_id", "c{}:texts", "texts"),
+            _pivot(tests, "test_kind_id", "t{}:result", "result"),
+            _pivot(tests, "test_kind_id", "t{}:note", "note"),
+        ],
+        visits,
+    )
+
+    names = {layout.id: layout.name for layout in layouts.values()}
+    base = [
+        pl.col("id"),
+        pl.col("created_at")
+        .dt.convert_time_zone(timezone.get_current_timezone_name())
+        .dt.replace_time_zone(None),
+        pl.col("internal_id"),
+        pl.col("status"),
+        pl.col("tags").list.join(", "),
+        pl.col("location"),
+        pl.col("tenant"),
+        pl.col("questionnaire_id")
+        .replace_strict(names, default=None, return_dtype=pl.String)
+        .alias("questionnaire"),
+        pl.col("client_id"),
+    ]
+
+    return frame.select(
+        *base,
+        *_answer_columns(frame, layouts, _client_columns),
+        *_answer_columns(frame, layouts, _consultant_columns),
+        *_test_columns(frame),
+    )
+
+
+def export_queryset(export: VisitExport) -> QuerySet[Visit]:
+    """The visits included in the export.
+
+    Incremental exports are limited to the visits modified within the
+    stored modified_since/modified_until window."""
+    queryset = Visit.objects.filter(
+        created_at__date__gte=export.start_date,
+        created_at__date__lte=export.end_date,
+    )
+
+    if not export.user.is_superuser:
+        tenant = export.user.consultant.tenant
+        queryset = queryset.filter(case__location__tenant=tenant)
+
+    if export.mode == ExportMode.INCREMENTAL:
+        queryset = queryset.filter(last_modified_at__lte=export.modified_until)
+        if export.modified_since:
+            queryset = queryset.filter(last_modified_at__gt=export.modified_since)
+
+    return queryset
+
+
+def questionnaire_ids(queryset: QuerySet[Visit]) -> list[int]:
+    return list(
+        queryset.order_by().values_list("questionnaire_id", flat=True).distinct()
+    )
+
+
+def shard_ranges(queryset: QuerySet[Visit], shard_size: int) -> list[tuple[int, int]]:
+    """Split the visits into (first pk, last pk) ranges of shard_size visits."""
+    visit_ids = (
+        queryset.order_by("pk")
+        .values_list("pk", flat=True)
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    return [(chunk[0], chunk[-1]) for chunk in batched(visit_ids, shard_size)]
+
+
+def iter_export_frames(
+    queryset: QuerySet[Visit],
+    layouts: dict[int, QuestionnaireLayout] | None = None,
+    chunk_size: int = CHUNK_SIZE,
+):
+    """Build the export frame in chunks of at most chunk_size visits.
+
+    The visit ids are streamed from a server-side cursor, so only one chunk is
+    held in memory at a time."""
+    if layouts is None:
+        layouts = load_layouts(questionnaire_ids(queryset))
+    visit_ids = (
+        queryset.order_by("pk")
+        .values_list("pk", flat=True)
+        .iterator(chunk_size=chunk_size)
+    )
+
+    empty = True
+    for chunk in batched(visit_ids, chunk_size):
+        empty = False
+        yield build_export_frame(Visit.objects.filter(pk__in=chunk), layouts)
+
+    if empty:
+        yield build_export_frame(queryset.none(), layouts)
+
+
+def write_parts(frames, directory: str):
+    """Write every frame to its own parquet file, yielding path and row count."""
+    for index, frame in enumerate(frames):
+        path = os.path.join(directory, f"part-{index:05}.parquet")
+        frame.write_parquet(path)
+        yield path, frame.height
+
+
+def write_xlsx(parts: list[str], output) -> None:
+    """Write the parquet parts into one worksheet, row by row.
+
+    xlsxwriter flushes every finished row to a temporary file in constant
+    memory mode, so at most one part is held in memory."""
+    workbook = xlsxwriter.Workbook(
+        output,
+        {
+            "constant_memory": True,
+            "default_date_format": "yyyy-mm-dd hh:mm:ss",
+            "remove_timezone": True,
+        },
+    )
+    worksheet = workbook.add_worksheet()
+
+    row = 0
+    for path in parts:
+        frame = pl.read_parquet(path)
+        if row == 0:
+            worksheet.write_row(row, 0, frame.columns)
+            row += 1
+        for values in frame.iter_rows():
+            worksheet.write_row(row, 0, values)
+            row += 1
+
+    workbook.close()
+
+
+def write_csv_gzip(parts: list[str], output) -> None:
+    with gzip.GzipFile(fileobj=output, mode="wb") as compressed:
+        for index, path in enumerate(parts):
+            pl.read_parquet(path).write_csv(
+                cast(IO[bytes], compressed), include_header=index == 0
+            )
+
+
+def write_parquet(parts: list[str], output) -> None:
+    pl.scan_parquet(parts).sink_parquet(output)
+
+
+def write_arrow(parts: list[str], output) -> None:
+    pl.scan_parquet(parts).sink_ipc(output)
+
+
+WRITERS = {
+    ExportFormat.XLSX: write_xlsx,
+    ExportFormat.PARQUET: write_parquet,
+    ExportFormat.ARROW: write_arrow,
+    ExportFormat.CSV_GZIP: write_csv_gzip,
+}
+
+
+def write_export(parts: list[str], export_format: str, output) -> None:
+    """Assemble the parquet parts into one file of the given format."""
+    WRITERS[ExportFormat(export_format)](parts, output)
@@ -2,7 +2,7 @@ import io
 
 import polars as pl
 from django.conf import settings
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.http import HttpRequest, HttpResponse
 from django.shortcuts import redirect
 from django.urls import URLPattern, path, reverse
@@ -10,7 +10,8 @@ from modeltranslation.admin import TabbedTranslationAdmin
 from unfold.admin import ModelAdmin
 from unfold.decorators import action
 
-from texts.models import Text
+from texts.models import Text, TranslationMemory
+from texts.tasks import translate_missing_texts
 from texts.views import ImportTextView
 
 # Register your models here.
@@ -23,7 +24,7 @@ class TextAdmin(ModelAdmin, TabbedTranslationAdmin):
     list_filter = ("internal",)
 
     actions = ["export_as_excel"]
-    actions_list = ["export_all_texts", "import_texts"]
+    actions_list = ["export_all_texts", "import_texts", "translate_missing"]
 
     list_editable = ("content",)
 
@@ -56,6 +57,12 @@ class TextAdmin(ModelAdmin, TabbedTranslationAdmin):
     def import_texts(self, request: HttpRequest):
         return redirect(reverse("admin:texts_import"))
 
+    @action(description="Translate missing texts", icon="translate")
+    def translate_missing(self, request: HttpRequest):
+        translate_missing_texts.delay()
+        messages.info(request, "Translating the missing texts in the background.")
+        return redirect(reverse("admin:texts_text_changelist"))
+
     def get_urls(self) -> list[URLPattern]:
         import_view = self.admin_site.admin_view(
             ImportTextView.as_view(model_admin=self)
@@ -63,3 +70,11 @@ class TextAdmin(ModelAdmin, TabbedTranslationAdmin):
         return [
             path("import/", import_view, name="texts_import"),
         ] + super().get_urls()
+
+
+@admin.register(TranslationMemory)
+class TranslationMemoryAdmin(ModelAdmin):
+    list_display = ("source", "target_language", "context", "translation")
+    list_filter = ("target_language", "formality")
+    search_fields = ("source", "translation")
+    readonly_fields = ("source_hash", "created_at")
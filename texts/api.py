@@ -1,9 +1,12 @@
 from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
 from django.utils import translation
+from django.utils.cache import patch_vary_headers
 from ninja import Form, ModelSchema, Schema
 from ninja.router import Router
 
 from sure.lang import inject_language
+from texts.bundle import get_bundle
 from texts.models import Text
 
 router = Router()
@@ -24,16 +27,19 @@ class TextsSchema(Schema):
 @router.get("texts/", response=TextsSchema, auth=None)
 @inject_language
 def list_texts(request):
-    texts = (
-        Text.objects.all()
-        if request.user.is_authenticated
-        else Text.objects.filter(internal=False)
-    )
-    return {
-        "language": translation.get_language(),
-        "right_to_left": translation.get_language_bidi(),
-        "texts": dict(list(texts.values_list("slug", "content"))),
-    }
+    body, etag = get_bundle(translation.get_language(), request.user.is_authenticated)
+    etag = f'"{etag}"'
+
+    if etag in request.headers.get("If-None-Match", ""):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type="application/json")
+
+    response["ETag"] = etag
+    # Clients may keep the bundle but have to revalidate it on every load
+    response["Cache-Control"] = "private, no-cache"
+    patch_vary_headers(response, ["Cookie"])
+    return response
 
 
 @router.get("languages/", response=list[tuple[str, str]], auth=None)
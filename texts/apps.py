@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class TextsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "texts"
+
+    def ready(self) -> None:
+        # pylint: disable-next=import-outside-toplevel,unused-import
+        from texts import signals  # noqa: F401
+
+        return super().ready()
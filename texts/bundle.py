@@ -0,0 +1,39 @@
+"""Precomputed texts bundle for the frontend.
+
+The bundle of a (language, internal) pair only changes when a text changes, it
+is encoded once per texts version and served with its content hash as ETag."""
+
+import hashlib
+import json
+from functools import lru_cache
+
+from django.core.cache import cache
+from django.utils.translation import get_language_bidi, override
+
+from .models import Text
+from .translate import TIMEOUT, texts_version
+
+
+@lru_cache(maxsize=32)
+def _load_bundle(version: int, language: str | None, internal: bool):
+    key = f"texts:bundle:{version}:{language}:{int(internal)}"
+    bundle = cache.get(key)
+    if bundle is None:
+        texts = Text.objects.all() if internal else Text.objects.filter(internal=False)
+        with override(language):
+            body = json.dumps(
+                {
+                    "language": language,
+                    "right_to_left": get_language_bidi(),
+                    "texts": dict(texts.values_list("slug", "content")),
+                },
+                ensure_ascii=False,
+            ).encode()
+        bundle = (body, hashlib.sha256(body).hexdigest()[:32])
+        cache.set(key, bundle, timeout=TIMEOUT)
+    return bundle
+
+
+def get_bundle(language: str | None, internal: bool) -> tuple[bytes, str]:
+    """The encoded bundle and its ETag."""
+    return _load_bundle(texts_version(), language, internal)
@@ -0,0 +1,45 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("texts", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TranslationMemory",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("source_hash", models.CharField(max_length=64)),
+                ("target_language", models.CharField(max_length=10)),
+                ("context", models.CharField(blank=True, max_length=100)),
+                ("formality", models.CharField(blank=True, max_length=20)),
+                ("source", models.TextField()),
+                ("translation", models.TextField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name_plural": "translation memory",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=(
+                            "source_hash",
+                            "target_language",
+                            "context",
+                            "formality",
+                        ),
+                        name="translation_memory_unique",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -2,6 +2,10 @@ from django.db import models
 from html_sanitizer import Sanitizer
 
 
+def sanitize(content: str) -> str:
+    return Sanitizer({"keep_typographic_whitespace": True}).sanitize(content)
+
+
 class Text(models.Model):
     slug = models.SlugField(primary_key=True)
     context = models.CharField(max_length=100, blank=True)
@@ -13,6 +17,32 @@ class Text(models.Model):
         return self.slug
 
     def save(self, *args, **kwargs):
-        sanitizer = Sanitizer({"keep_typographic_whitespace": True})
-        self.content = sanitizer.sanitize(self.content)
+        self.content = sanitize(self.content)
         super().save(*args, **kwargs)
+
+
+class TranslationMemory(models.Model):
+    """Machine translations of English source strings, so every distinct
+    string is only sent to the translator once."""
+
+    source_hash = models.CharField(max_length=64)
+    target_language = models.CharField(max_length=10)
+    context = models.CharField(max_length=100, blank=True)
+    formality = models.CharField(max_length=20, blank=True)
+
+    source = models.TextField()
+    translation = models.TextField()
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name_plural = "translation memory"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["source_hash", "target_language", "context", "formality"],
+                name="translation_memory_unique",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.source[:50]} ({self.target_language})"
@@ -0,0 +1,15 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from texts.models import Text
+from texts.translate import invalidate_texts
+
+
+@receiver(post_save, sender=Text)
+@receiver(post_delete, sender=Text)
+def invalidate_text_cache(sender, **kwargs):
+    invalidate_texts()
+    # Again after the commit, a concurrent request could have cached the old
+    # texts under the new version in the meantime.
+    transaction.on_commit(invalidate_texts)
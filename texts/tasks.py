@@ -1,31 +1,107 @@
-import deepl
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import batched
+
 from celery import shared_task
 from django.conf import settings
 from django.utils.translation import activate
 
-from .models import Text
+from .models import Text, sanitize
+from .translate import invalidate_texts
+from .translation_memory import recall, remember, translate_cached
+from .translators import get_translator
+
+logger = logging.getLogger(__name__)
 
 
 @shared_task
 def translate_text_task(slug, language):
     text = Text.objects.get(slug=slug)
 
-    client = deepl.Translator(settings.DEEPL_API_KEY)
-
     activate("en")
     text_orig = text.content
 
-    result = client.translate_text(
-        text=text_orig,
-        source_lang="EN",
-        target_lang=language if language != "pt" else "PT-PT",
-        context=text.context or None,
-        formality="prefer_more",
-    )
+    (result,) = translate_cached([text_orig], language, text.context)
 
     activate(language)
-    if isinstance(result, list):
-        text.content = result[0].text  # type: ignore
-    else:
-        text.content = result.text
+    text.content = result
     text.save()
+
+
+def missing_translations(texts: list[Text], languages):
+    """The texts without translation, by language and context."""
+    groups: dict[tuple[str, str], list[Text]] = {}
+    for language in languages:
+        for text in texts:
+            if not getattr(text, f"content_{language}"):
+                groups.setdefault((language, text.context), []).append(text)
+    return groups
+
+
+@shared_task
+def translate_missing_texts(languages=None) -> int:
+    """Translate all texts missing in the languages (default: all but English)
+    and return the number of translations.
+
+    Translations are taken from the translation memory where possible, the
+    remaining distinct strings are sent in concurrent batches and all results
+    are saved at once."""
+    if languages is None:
+        languages = [code for code, _ in settings.LANGUAGES if code != "en"]
+
+    texts = list(Text.objects.exclude(content_en__isnull=True).exclude(content_en=""))
+    translator = get_translator()
+    groups = missing_translations(texts, languages)
+
+    known: dict[tuple[str, str], dict[str, str]] = {}
+    pending = []
+    for (language, context), group in groups.items():
+        sources = list(dict.fromkeys(text.content_en for text in group))
+        known[language, context] = recall(
+            sources, language, context, translator.formality
+        )
+        missing = [
+            source for source in sources if source not in known[language, context]
+        ]
+        for batch in batched(missing, translator.batch_size):
+            pending.append((language, context, list(batch)))
+
+    with ThreadPoolExecutor(settings.TEXTS_TRANSLATION_CONCURRENCY) as pool:
+        futures = {
+            pool.submit(translator.translate, batch, language, context): (
+                language,
+                context,
+                batch,
+            )
+            for language, context, batch in pending
+        }
+        for future in as_completed(futures):
+            language, context, batch = futures[future]
+            try:
+                results = future.result()
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("Translating %d texts to %s", len(batch), language)
+                continue
+
+            translations = dict(zip(batch, results, strict=True))
+            remember(translations, language, context, translator.formality)
+            known[language, context].update(translations)
+
+    translated: dict[str, Text] = {}
+    fields = set()
+    count = 0
+    for (language, context), group in groups.items():
+        for text in group:
+            result = known[language, context].get(text.content_en)
+            if result is None:
+                continue
+            setattr(text, f"content_{language}", sanitize(result))
+            translated[text.slug] = text
+            fields.add(f"content_{language}")
+            count += 1
+
+    if translated:
+        Text.objects.bulk_update(translated.values(), sorted(fields), batch_size=500)
+        invalidate_texts()
+
+    return count
@@ -1 +1,105 @@
-# Create your tests here.
+from django.test import TestCase, override_settings
+from modeltranslation.utils import build_localized_fieldname
+
+from texts.models import Text, TranslationMemory
+from texts.tasks import translate_missing_texts
+from texts.translate import translate
+from texts.translation_memory import source_hash, translate_cached
+from texts.translators import get_translator
+
+
+def content(text: Text, language: str) -> str:
+    return getattr(text, build_localized_fieldname("content", language))
+
+
+class TranslateTest(TestCase):
+    def test_translate(self):
+        Text.objects.create(slug="greeting", content_en="Hello", content_de="Hallo")
+
+        self.assertEqual(translate("greeting", "de"), "Hallo")
+        self.assertEqual(translate("greeting", "en"), "Hello")
+        self.assertEqual(translate("unknown", "de"), "unknown")
+
+    def test_cache_invalidated_on_save(self):
+        text = Text.objects.create(slug="greeting", content_en="Hello")
+        self.assertEqual(translate("greeting", "en"), "Hello")
+
+        setattr(text, build_localized_fieldname("content", "en"), "Hi")
+        text.save()
+
+        self.assertEqual(translate("greeting", "en"), "Hi")
+
+
+class TextsBundleTest(TestCase):
+    def test_etag(self):
+        Text.objects.create(slug="greeting", content_en="Hello")
+
+        response = self.client.get("/api/texts/texts/?lang=en", secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["texts"], {"greeting": "Hello"})
+        etag = response["ETag"]
+
+        response = self.client.get(
+            "/api/texts/texts/?lang=en", headers={"If-None-Match": etag}, secure=True
+        )
+        self.assertEqual(response.status_code, 304)
+
+        Text.objects.create(slug="farewell", content_en="Bye")
+
+        response = self.client.get(
+            "/api/texts/texts/?lang=en", headers={"If-None-Match": etag}, secure=True
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_internal_texts_hidden(self):
+        Text.objects.create(slug="staff", content_en="Staff only", internal=True)
+
+        response = self.client.get("/api/texts/texts/?lang=en", secure=True)
+
+        self.assertEqual(response.json()["texts"], {})
+
+
+@override_settings(TEXTS_TRANSLATOR_BACKEND="texts.translators.FakeTranslator")
+class TranslateMissingTextsTest(TestCase):
+    def setUp(self):
+        get_translator.cache_clear()
+
+    def tearDown(self):
+        get_translator.cache_clear()
+
+    def test_translate_missing(self):
+        Text.objects.create(slug="greeting", content_en="Hello", content_de="Hallo")
+        Text.objects.create(slug="farewell", content_en="Bye", context="Button")
+
+        self.assertEqual(translate_missing_texts(["de", "fr"]), 3)
+
+        greeting = Text.objects.get(slug="greeting")
+        self.assertEqual(content(greeting, "de"), "Hallo")
+        self.assertEqual(content(greeting, "fr"), "[fr] Hello")
+        self.assertEqual(content(Text.objects.get(slug="farewell"), "de"), "[de] Bye")
+        self.assertEqual(translate("farewell", "fr"), "[fr] Bye")
+
+        self.assertEqual(translate_missing_texts(["de", "fr"]), 0)
+
+    def test_translation_memory(self):
+        TranslationMemory.objects.create(
+            source_hash=source_hash("Hello"),
+            target_language="de",
+            source="Hello",
+            translation="Guten Tag",
+        )
+        Text.objects.create(slug="greeting", content_en="Hello")
+        Text.objects.create(slug="welcome", content_en="Hello")
+        Text.objects.create(slug="farewell", content_en="Bye")
+        Text.objects.create(slug="goodbye", content_en="Bye")
+
+        self.assertEqual(translate_missing_texts(["de"]), 4)
+
+        self.assertEqual(content(Text.objects.get(slug="welcome"), "de"), "Guten Tag")
+        self.assertEqual(content(Text.objects.get(slug="goodbye"), "de"), "[de] Bye")
+        # Each distinct string is remembered once
+        self.assertEqual(TranslationMemory.objects.filter(source="Bye").count(), 1)
+        self.assertEqual(
+            translate_cached(["Bye", "Hello"], "de"), ["[de] Bye", "Guten Tag"]
+        )
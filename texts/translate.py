@@ -1,16 +1,59 @@
-from django.utils.translation import activate, get_language
+"""Cached text lookups.
+
+All texts of a language are loaded at once and kept in two tiers: the Redis
+cache shared by all processes and an LRU cache per process, so translating is
+a dictionary lookup. Every change to a text stores a new version in Redis,
+processes notice it within VERSION_CHECK_INTERVAL seconds."""
+
+import time
+from functools import lru_cache
+
+from django.core.cache import cache
+from django.utils.translation import get_language, override
+
+from core.cache_version import bump_version, get_version
 
 from .models import Text
 
+VERSION_KEY = "texts:version"
+VERSION_CHECK_INTERVAL = 5
+TIMEOUT = 60 * 60 * 24
+
+_version: int | None = None
+_version_checked_at = 0.0
+
+
+def texts_version() -> int:
+    global _version, _version_checked_at  # pylint: disable=global-statement
+
+    now = time.monotonic()
+    if _version is None or now - _version_checked_at >= VERSION_CHECK_INTERVAL:
+        _version = get_version(VERSION_KEY)
+        _version_checked_at = now
+    return _version
+
+
+def invalidate_texts() -> None:
+    global _version  # pylint: disable=global-statement
+
+    _version = bump_version(VERSION_KEY)
+
+
+@lru_cache(maxsize=32)
+def _load_texts(version: int, language: str | None) -> dict[str, str]:
+    key = f"texts:{version}:{language}"
+    texts = cache.get(key)
+    if texts is None:
+        with override(language):
+            texts = {text.slug: text.content for text in Text.objects.all()}
+        cache.set(key, texts, timeout=TIMEOUT)
+    return texts
+
+
+def get_texts(language=None) -> dict[str, str]:
+    """All texts of the language (default: the active one) by slug."""
+    return _load_texts(texts_version(), language or get_language())
+
 
 def translate(slug, language=None):
-    old_language = get_language()
-    try:
-        if language:
-            activate(language)
-        text = Text.objects.filter(slug=slug).first()
-        if not text:
-            return slug
-        return text.content
-    finally:
-        activate(old_language)
+    return get_texts(language).get(slug, slug)
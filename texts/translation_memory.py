@@ -0,0 +1,69 @@
+"""Translation memory in front of the translator backend.
+
+Translations are stored per source string, target language, context and
+formality. Only strings missing in the memory are sent to the translator,
+each of them once, no matter how many texts share it."""
+
+import hashlib
+from itertools import batched
+
+from .models import TranslationMemory
+from .translators import BaseTranslator, get_translator
+
+
+def source_hash(source: str) -> str:
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def recall(sources, language: str, context: str, formality: str) -> dict[str, str]:
+    """The remembered translations of the sources, by source."""
+    hashes = {source_hash(source) for source in sources}
+    return dict(
+        TranslationMemory.objects.filter(
+            source_hash__in=hashes,
+            target_language=language,
+            context=context,
+            formality=formality,
+        ).values_list("source", "translation")
+    )
+
+
+def remember(
+    translations: dict[str, str], language: str, context: str, formality: str
+) -> None:
+    TranslationMemory.objects.bulk_create(
+        [
+            TranslationMemory(
+                source_hash=source_hash(source),
+                target_language=language,
+                context=context,
+                formality=formality,
+                source=source,
+                translation=translation,
+            )
+            for source, translation in translations.items()
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def translate_cached(
+    sources: list[str],
+    language: str,
+    context: str = "",
+    translator: BaseTranslator | None = None,
+) -> list[str]:
+    """Translate the sources, asking the translator only for new strings."""
+    translator = translator or get_translator()
+    known = recall(sources, language, context, translator.formality)
+
+    pending = [source for source in dict.fromkeys(sources) if source not in known]
+    translated: dict[str, str] = {}
+    for batch in batched(pending, translator.batch_size):
+        translated.update(
+            zip(batch, translator.translate(list(batch), language, context))
+        )
+
+    remember(translated, language, context, translator.formality)
+    known.update(translated)
+    return [known[source] for source in sources]
@@ -0,0 +1,54 @@
+"""Machine translation backends.
+
+The backend is configured with the TEXTS_TRANSLATOR_BACKEND setting, the fake
+backend translates offline for tests and development."""
+
+from abc import ABC, abstractmethod
+from functools import lru_cache
+
+import deepl
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class BaseTranslator(ABC):
+    # Maximal number of texts per request
+    batch_size = 50
+    formality = ""
+
+    @abstractmethod
+    def translate(
+        self, texts: list[str], language: str, context: str | None = None
+    ) -> list[str]:
+        """Translate the English texts into the language, in order."""
+
+
+class DeepLTranslator(BaseTranslator):
+    formality = "prefer_more"
+
+    def __init__(self, api_key: str | None = None):
+        # The client keeps its HTTP session, reuse the translator instance.
+        self.client = deepl.Translator(api_key or settings.DEEPL_API_KEY)
+
+    def target_language(self, language: str) -> str:
+        return "PT-PT" if language == "pt" else language.upper()
+
+    def translate(self, texts, language, context=None):
+        results = self.client.translate_text(
+            text=texts,
+            source_lang="EN",
+            target_lang=self.target_language(language),
+            context=context or None,
+            formality=self.formality,
+        )
+        return [result.text for result in results]  # type: ignore[union-attr]
+
+
+class FakeTranslator(BaseTranslator):
+    def translate(self, texts, language, context=None):
+        return [f"[{language}] {text}" for text in texts]
+
+
+@lru_cache(maxsize=1)
+def get_translator() -> BaseTranslator:
+    return import_string(settings.TEXTS_TRANSLATOR_BACKEND)()